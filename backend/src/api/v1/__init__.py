@@ -4,9 +4,11 @@ from fastapi import APIRouter
 
 from src.api.v1.dbs import router as dbs_router
 from src.api.v1.llm import router as llm_router
+from src.api.v1.metrics import router as metrics_router
 
 api_router = APIRouter()
 
 # Include sub-routers
 api_router.include_router(dbs_router, prefix="/dbs", tags=["databases"])
 api_router.include_router(llm_router, prefix="/llm", tags=["llm"])
+api_router.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
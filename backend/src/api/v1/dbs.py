@@ -1,26 +1,57 @@
 """Database API endpoints."""
 
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import Response
+import asyncio
+from collections.abc import Awaitable
+from typing import TypeVar
 
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+
+from src.config import get_settings
 from src.models.database import (
     AddDatabaseRequest,
     DatabaseConnection,
     DatabaseConnectionDetail,
     UpdateFieldRequest,
     FieldMetadata,
+    RefreshJob,
 )
 from src.models.query import QueryRequest, QueryResult
 from src.models.llm import NaturalQueryRequest, NaturalQueryResult
 from src.models.errors import ErrorResponse
 from src.services.database import get_database_service
 from src.services.query import get_query_service
-from src.services.export import get_export_service
+from src.services.export import COLUMNAR_MEDIA_TYPE, get_export_service
+from src.services.scheduler import QueryRejectedError
 from src.services.llm import get_llm_service
+from src.services.refresh import get_refresh_service
 from src.storage.sqlite import get_storage
 
 router = APIRouter()
 
+T = TypeVar("T")
+
+
+async def _cancel_on_disconnect(http_request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await a coroutine, cancelling it if the client disconnects first.
+    Cancelling a query makes the driver stop the statement on the database server.
+    """
+    task = asyncio.ensure_future(awaitable)
+    interval = get_settings().disconnect_poll_interval
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise HTTPException(status_code=499, detail="客户端已断开连接")
+    finally:
+        if not task.done():
+            task.cancel()
+
 
 @router.get(
     "",
@@ -40,10 +71,17 @@ async def get_databases() -> list[DatabaseConnection]:
     summary="添加或更新数据库连接",
 )
 async def add_database(name: str, request: AddDatabaseRequest) -> DatabaseConnectionDetail:
-    """Add or update a database connection."""
+    """
+    Add or update a database connection and start a background metadata refresh.
+    The response carries the refresh job; its status is at GET /{name}/refresh/{job_id}.
+    """
     try:
         service = get_database_service()
-        return await service.add_connection(name, request.url)
+        detail = await service.add_connection(
+            name, request.url, request.query_timeout, request.result_cache_ttl
+        )
+        job = get_refresh_service().start(name)
+        return detail.model_copy(update={"refresh_job": job})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -81,17 +119,37 @@ async def delete_database(name: str) -> None:
 
 @router.post(
     "/{name}/refresh",
-    response_model=DatabaseConnectionDetail,
-    responses={404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    response_model=RefreshJob,
+    status_code=202,
+    responses={404: {"model": ErrorResponse}},
     summary="刷新数据库元数据",
 )
-async def refresh_metadata(name: str) -> DatabaseConnectionDetail:
-    """Refresh metadata for a database connection."""
-    service = get_database_service()
-    result = await service.refresh_metadata(name)
-    if result is None:
+async def refresh_metadata(
+    name: str,
+    force: bool = Query(False, description="即使结构未变化也重新读取元数据"),
+) -> RefreshJob:
+    """
+    Start a background metadata refresh for a database connection.
+    If a refresh is already running for the connection, that job is returned.
+    """
+    storage = await get_storage()
+    if await storage.get_connection_url(name) is None:
         raise HTTPException(status_code=404, detail=f"数据库连接 '{name}' 不存在")
-    return result
+    return get_refresh_service().start(name, force)
+
+
+@router.get(
+    "/{name}/refresh/{job_id}",
+    response_model=RefreshJob,
+    responses={404: {"model": ErrorResponse}},
+    summary="获取元数据刷新进度",
+)
+async def get_refresh_job(name: str, job_id: str) -> RefreshJob:
+    """Get the status and progress of a metadata refresh job."""
+    job = get_refresh_service().get_job(job_id)
+    if job is None or job.connection_name != name:
+        raise HTTPException(status_code=404, detail=f"刷新任务 '{job_id}' 不存在")
+    return job
 
 
 @router.patch(
@@ -115,74 +173,132 @@ async def update_field_chinese_name(
         )
 
     # Get the updated field
-    conn = await storage.get_connection_with_metadata(name)
-    if conn is None:
-        raise HTTPException(status_code=404, detail=f"数据库连接 '{name}' 不存在")
-
-    for table in conn.tables:
-        if table.table_name == table_name:
-            for field in table.fields:
-                if field.field_name == field_name:
-                    return field
-
-    raise HTTPException(status_code=404, detail="字段未找到")
+    field = await storage.get_field_metadata(name, table_name, field_name)
+    if field is None:
+        raise HTTPException(status_code=404, detail="字段未找到")
+    return field
 
 
 @router.post(
     "/{name}/query",
     response_model=QueryResult,
-    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
+    responses={
+        400: {"model": ErrorResponse},
+        404: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        500: {"model": ErrorResponse},
+        504: {"model": ErrorResponse},
+    },
     summary="执行 SQL 查询",
 )
-async def execute_query(name: str, request: QueryRequest) -> QueryResult:
-    """Execute a SQL query against the database."""
+async def execute_query(
+    name: str, request: QueryRequest, http_request: Request
+) -> QueryResult | Response:
+    """
+    Execute a SQL query against the database, cancelling it if the client goes away.
+    Clients sending `Accept: application/vnd.dbquery.columnar+json` get a compact
+    column-major body that skips per-cell model validation.
+    """
     try:
         service = get_query_service()
-        return await service.execute_query(name, request)
+        if COLUMNAR_MEDIA_TYPE in http_request.headers.get("accept", ""):
+            result = await _cancel_on_disconnect(
+                http_request, service.execute_query_raw(name, request)
+            )
+            return Response(
+                content=get_export_service().encode_columnar(result),
+                media_type=COLUMNAR_MEDIA_TYPE,
+            )
+        return await _cancel_on_disconnect(http_request, service.execute_query(name, request))
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except QueryRejectedError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"查询执行失败: {str(e)}")
 
 
+@router.post(
+    "/{name}/query/stream",
+    responses={
+        400: {"model": ErrorResponse},
+        404: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+        504: {"model": ErrorResponse},
+    },
+    summary="流式执行 SQL 查询",
+)
+async def stream_query(name: str, request: QueryRequest) -> StreamingResponse:
+    """Execute a SQL query and stream the rows as NDJSON."""
+    try:
+        service = get_query_service()
+        batches = await service.stream_query(name, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except QueryRejectedError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"查询执行失败: {str(e)}")
+
+    export_service = get_export_service()
+    return StreamingResponse(
+        export_service.stream_ndjson(batches),
+        media_type="application/x-ndjson",
+    )
+
+
 @router.post(
     "/{name}/query/export",
-    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+    responses={
+        400: {"model": ErrorResponse},
+        404: {"model": ErrorResponse},
+        429: {"model": ErrorResponse},
+    },
     summary="导出查询结果",
 )
 async def export_query_result(
     name: str,
     request: QueryRequest,
     format: str = Query(..., description="导出格式: csv 或 json"),
-) -> Response:
+) -> StreamingResponse:
     """Execute a query and export results."""
     if format not in ("csv", "json"):
         raise HTTPException(status_code=400, detail="导出格式必须是 csv 或 json")
 
     try:
-        # Execute query
+        # Stream rows from the database cursor straight into the response
         query_service = get_query_service()
-        result = await query_service.execute_query(name, request)
+        batches = await query_service.stream_query(
+            name, request, limit=get_settings().export_max_rows
+        )
 
         # Export
         export_service = get_export_service()
         if format == "csv":
-            content = export_service.export_csv(result)
-            return Response(
-                content=content,
+            return StreamingResponse(
+                export_service.stream_csv(batches),
                 media_type="text/csv",
                 headers={"Content-Disposition": "attachment; filename=query_result.csv"},
             )
         else:
-            content = export_service.export_json(result)
-            return Response(
-                content=content,
+            return StreamingResponse(
+                export_service.stream_json(batches),
                 media_type="application/json",
                 headers={"Content-Disposition": "attachment; filename=query_result.json"},
             )
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except QueryRejectedError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
 
@@ -196,15 +312,14 @@ async def export_query_result(
 async def natural_query(name: str, request: NaturalQueryRequest) -> NaturalQueryResult:
     """Generate SQL from natural language query."""
     try:
-        # Get database info
-        db_service = get_database_service()
-        database = await db_service.get_connection(name)
-        if database is None:
+        # Get database metadata, cached per schema version
+        llm_service = get_llm_service()
+        context = await llm_service.get_metadata_context(name)
+        if context is None:
             raise HTTPException(status_code=404, detail=f"数据库连接 '{name}' 不存在")
 
         # Generate SQL
-        llm_service = get_llm_service()
-        return await llm_service.generate_sql(request, database)
+        return await llm_service.generate_sql(request, context)
 
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
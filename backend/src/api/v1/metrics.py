@@ -0,0 +1,37 @@
+"""Metrics API endpoints."""
+
+from fastapi import APIRouter
+
+from src.models.metrics import (
+    CacheStats,
+    LruCacheStats,
+    MetricsResponse,
+    QueryQueueStats,
+    ResultCacheStats,
+    SingleFlightStats,
+)
+from src.services.query import get_query_service
+from src.services.result_cache import get_result_cache
+from src.services.scheduler import get_scheduler
+from src.storage.sqlite import get_storage
+
+router = APIRouter()
+
+
+@router.get(
+    "",
+    response_model=MetricsResponse,
+    summary="获取运行指标",
+)
+async def get_metrics() -> MetricsResponse:
+    """Get runtime metrics such as cache hit/miss counters."""
+    storage = await get_storage()
+    return MetricsResponse(
+        storage_cache=CacheStats(**storage.cache.stats()),
+        sql_cache=LruCacheStats(**get_query_service().sql_cache_info()),
+        result_cache=ResultCacheStats(**get_result_cache().stats()),
+        single_flight=SingleFlightStats(**get_query_service().single_flight_info()),
+        query_queues={
+            name: QueryQueueStats(**stats) for name, stats in get_scheduler().stats().items()
+        },
+    )
@@ -11,11 +11,34 @@ class Settings:
     # Database paths
     db_query_dir: Path = Path.home() / ".db_query"
     sqlite_db_path: Path = db_query_dir / "db_query.db"
+    sqlite_statement_cache_size: int = 256
+
+    # In-process cache for connection URLs and metadata
+    storage_cache_max_entries: int = int(os.environ.get("STORAGE_CACHE_MAX_ENTRIES", "256"))
+    storage_cache_ttl: float = float(os.environ.get("STORAGE_CACHE_TTL", "60"))
 
     # LLM API Keys
     dashscope_api_key: str = os.environ.get("DASHSCOPE_API_KEY", "")
     moonshot_api_key: str = os.environ.get("MOONSHOT_API_KEY", "")
 
+    # LLM API endpoints (OpenAI-compatible), overridable e.g. to point at a local mock
+    dashscope_base_url: str = os.environ.get(
+        "DASHSCOPE_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1"
+    )
+    moonshot_base_url: str = os.environ.get("MOONSHOT_BASE_URL", "https://api.moonshot.cn/v1")
+
+    # Shared HTTP client for LLM API calls
+    llm_timeout: float = float(os.environ.get("LLM_TIMEOUT", "60"))
+    llm_connect_timeout: float = float(os.environ.get("LLM_CONNECT_TIMEOUT", "10"))
+    llm_max_connections: int = int(os.environ.get("LLM_MAX_CONNECTIONS", "20"))
+    llm_max_keepalive_connections: int = int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    llm_keepalive_expiry: float = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", "60"))
+
+    # Schemas estimated above this many tokens are narrowed for the natural language
+    # prompt to the tables picked by relevance, plus the tables they reference
+    llm_context_max_tokens: int = int(os.environ.get("LLM_CONTEXT_MAX_TOKENS", "16000"))
+    llm_context_top_k: int = int(os.environ.get("LLM_CONTEXT_TOP_K", "15"))
+
     # Server settings
     host: str = "0.0.0.0"
     port: int = 8000
@@ -24,6 +47,55 @@ class Settings:
     # Query settings
     default_limit: int = 1000
     max_rows: int = 10000
+    sql_cache_size: int = int(os.environ.get("SQL_CACHE_SIZE", "1024"))
+
+    # Statement timeout in seconds, unless a connection sets its own
+    query_timeout: float = float(os.environ.get("QUERY_TIMEOUT", "30"))
+    # Extra time before the client gives up on a statement the server should have stopped
+    query_timeout_grace: float = 2.0
+    # Statement timeout in seconds for streamed queries and exports, 0 for none
+    export_timeout: float = float(os.environ.get("EXPORT_TIMEOUT", "0"))
+    disconnect_poll_interval: float = 0.5
+
+    # Concurrent queries per connection, and the queue for queries beyond that
+    max_concurrent_queries: int = int(os.environ.get("MAX_CONCURRENT_QUERIES", "8"))
+    query_queue_size: int = int(os.environ.get("QUERY_QUEUE_SIZE", "32"))
+    query_queue_timeout: float = float(os.environ.get("QUERY_QUEUE_TIMEOUT", "10"))
+
+    # Query result cache; TTL 0 disables it unless a connection sets its own
+    result_cache_ttl: float = float(os.environ.get("RESULT_CACHE_TTL", "0"))
+    result_cache_max_bytes: int = int(
+        os.environ.get("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+    )
+
+    # Periodic metadata refresh; interval 0 disables it. Failed refreshes back off
+    # exponentially up to the max backoff.
+    metadata_refresh_interval: float = float(os.environ.get("METADATA_REFRESH_INTERVAL", "600"))
+    metadata_refresh_jitter: float = float(os.environ.get("METADATA_REFRESH_JITTER", "0.1"))
+    metadata_refresh_parallelism: int = int(os.environ.get("METADATA_REFRESH_PARALLELISM", "4"))
+    metadata_refresh_max_backoff: float = float(
+        os.environ.get("METADATA_REFRESH_MAX_BACKOFF", "21600")
+    )
+    metadata_refresh_tick: float = 30.0
+    # Cap on connections used for introspection by all refreshes, manual or periodic
+    max_introspection_connections: int = int(os.environ.get("MAX_INTROSPECTION_CONNECTIONS", "8"))
+
+    # Streaming query settings
+    stream_batch_size: int = int(os.environ.get("STREAM_BATCH_SIZE", "500"))
+    stream_limit: int = int(os.environ.get("STREAM_LIMIT", "1000000"))
+    export_max_rows: int = int(os.environ.get("EXPORT_MAX_ROWS", "1000000"))
+
+    # Target database connection pool settings
+    pool_min_size: int = int(os.environ.get("DB_POOL_MIN_SIZE", "1"))
+    pool_max_size: int = int(os.environ.get("DB_POOL_MAX_SIZE", "10"))
+    pool_recycle: float = float(os.environ.get("DB_POOL_RECYCLE", "300"))
+    pool_acquire_timeout: float = float(os.environ.get("DB_POOL_ACQUIRE_TIMEOUT", "10"))
+    pool_close_timeout: float = 5.0
+    # Pooled connections idle longer than this are pinged before use; 0 pings every time
+    pool_health_check_idle: float = float(os.environ.get("DB_POOL_HEALTH_CHECK_IDLE", "30"))
+    pool_health_check_timeout: float = 5.0
+    # Prepared statements kept per pooled PostgreSQL connection
+    pg_statement_cache_size: int = int(os.environ.get("PG_STATEMENT_CACHE_SIZE", "100"))
 
     def __init__(self) -> None:
         """Ensure db_query_dir exists."""
@@ -10,7 +10,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from src.api.v1 import api_router
-from src.storage.sqlite import get_storage
+from src.services.llm import get_llm_service
+from src.services.pool import get_pool_manager
+from src.services.refresh import get_refresh_service
+from src.storage.sqlite import close_storage, get_storage
 
 # Configure logging
 logging.basicConfig(
@@ -26,10 +29,15 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
     # Startup: Initialize storage
     logger.info("Starting application...")
     await get_storage()
+    get_refresh_service().start_periodic()
     logger.info("Application started successfully")
     yield
-    # Shutdown: Cleanup if needed
+    # Shutdown: Stop refresh jobs, then close LLM clients, target database pools and storage
     logger.info("Shutting down application...")
+    await get_refresh_service().close()
+    await get_llm_service().close()
+    await get_pool_manager().close_all()
+    await close_storage()
 
 
 app = FastAPI(
@@ -1,6 +1,7 @@
 """Database models for connections and metadata."""
 
 from datetime import datetime
+from pydantic import Field
 from src.models import CamelModel
 
 
@@ -34,18 +35,37 @@ class DatabaseConnection(CamelModel):
     db_type: str  # 'postgres' or 'mysql'
     created_at: datetime
     updated_at: datetime
+    query_timeout: float | None = None  # seconds, None uses the default timeout
+    result_cache_ttl: float | None = None  # seconds, None uses the default, 0 disables
+
+
+class RefreshJob(CamelModel):
+    """Background metadata refresh job."""
+
+    job_id: str
+    connection_name: str
+    status: str = "pending"  # 'pending', 'running', 'succeeded' or 'failed'
+    tables_total: int | None = None  # known once the table list is fetched
+    tables_done: int = 0
+    schema_changed: bool | None = None  # False when the schema signature was unchanged
+    error: str | None = None
+    started_at: datetime
+    finished_at: datetime | None = None
 
 
 class DatabaseConnectionDetail(DatabaseConnection):
     """Database connection with metadata."""
 
     tables: list[TableMetadata] = []
+    refresh_job: RefreshJob | None = None  # set when a metadata refresh was started
 
 
 class AddDatabaseRequest(CamelModel):
     """Request to add a database connection."""
 
     url: str
+    query_timeout: float | None = Field(default=None, gt=0)
+    result_cache_ttl: float | None = Field(default=None, ge=0)
 
 
 class UpdateFieldRequest(CamelModel):
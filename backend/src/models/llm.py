@@ -24,3 +24,6 @@ class NaturalQueryResult(CamelModel):
     sql: str
     explanation: str | None = None
     model_id: str
+    context_tables: int = 0  # tables described in the prompt
+    prompt_tokens: int = 0  # estimated tokens of the prompt sent
+    full_prompt_tokens: int = 0  # estimated tokens had every table been included
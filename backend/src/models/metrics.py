@@ -0,0 +1,56 @@
+"""Runtime metrics models."""
+
+from src.models import CamelModel
+
+
+class CacheStats(CamelModel):
+    """Counters for an in-process cache."""
+
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class LruCacheStats(CamelModel):
+    """Counters for an LRU cache without expiry."""
+
+    size: int
+    hits: int
+    misses: int
+
+
+class ResultCacheStats(CacheStats):
+    """Counters for the query result cache."""
+
+    bytes: int
+
+
+class SingleFlightStats(CamelModel):
+    """Counters for coalescing of identical concurrent queries."""
+
+    in_flight: int
+    executions: int
+    coalesced: int
+
+
+class QueryQueueStats(CamelModel):
+    """Admission counters for the queries of one connection."""
+
+    in_flight: int
+    queued: int
+    admitted: int
+    rejected: int
+    avg_wait_ms: float
+    max_wait_ms: float
+
+
+class MetricsResponse(CamelModel):
+    """Runtime metrics of the service."""
+
+    storage_cache: CacheStats
+    sql_cache: LruCacheStats
+    result_cache: ResultCacheStats
+    single_flight: SingleFlightStats
+    query_queues: dict[str, QueryQueueStats]
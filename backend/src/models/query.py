@@ -1,5 +1,7 @@
 """Query models for SQL execution."""
 
+from pydantic import Field
+
 from src.models import CamelModel
 
 
@@ -7,6 +9,11 @@ class QueryRequest(CamelModel):
     """Request to execute a SQL query."""
 
     sql: str
+    timeout: float | None = Field(default=None, gt=0)  # seconds, may only lower the timeout
+    page_size: int | None = Field(default=None, gt=0)  # fetch one page instead of up to max_rows
+    page_token: str | None = None  # next_page_token of the previous page
+    # Bind parameters for $1, $2, ... (PostgreSQL) or ? (MySQL) placeholders
+    params: list[str | int | float | bool | None] | None = None
 
 
 class Column(CamelModel):
@@ -23,3 +30,7 @@ class QueryResult(CamelModel):
     rows: list[list]
     row_count: int
     execution_time: float  # milliseconds
+    truncated: bool = False  # more rows were available than max_rows
+    cached: bool = False  # served from the result cache
+    cache_age: float | None = None  # seconds since the cached result was fetched
+    next_page_token: str | None = None  # set for paged queries when more rows follow
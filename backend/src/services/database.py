@@ -1,6 +1,7 @@
 """Database connection service."""
 
 from urllib.parse import urlparse
+from collections.abc import Callable
 from typing import Any
 import asyncpg
 import aiomysql
@@ -45,24 +46,37 @@ class DatabaseService:
         storage = await get_storage()
         return await storage.get_connection_with_metadata(name)
 
-    async def add_connection(self, name: str, url: str) -> DatabaseConnectionDetail:
-        """Add a database connection and fetch metadata."""
-        from src.services.metadata import MetadataService
+    async def add_connection(
+        self,
+        name: str,
+        url: str,
+        query_timeout: float | None = None,
+        result_cache_ttl: float | None = None,
+    ) -> DatabaseConnectionDetail:
+        """
+        Add or update a database connection.
+        Metadata is not fetched here; start a refresh job for that.
+        """
+        from src.services.pool import get_pool_manager
+        from src.services.refresh import get_refresh_service
+        from src.services.result_cache import get_result_cache
 
         # Parse URL to get db_type
         parsed = parse_db_url(url)
         db_type = parsed["db_type"]
 
-        # Save connection
+        # Save connection. If the URL changed, stop any refresh that may still be
+        # reading the old database (refreshes started from now on see the new URL)
+        # and drop the old pool.
         storage = await get_storage()
-        await storage.add_connection(name, url, db_type)
-
-        # Fetch and save metadata
-        metadata_service = MetadataService()
-        tables = await metadata_service.fetch_metadata(url, db_type)
-        await storage.save_metadata(name, tables)
-
-        # Return connection with metadata
+        old_url = await storage.get_connection_url(name)
+        await storage.add_connection(name, url, db_type, query_timeout, result_cache_ttl)
+        if old_url is not None and old_url != url:
+            await get_refresh_service().cancel(name)
+            await get_pool_manager().close_pool(name)
+        get_result_cache().invalidate(name)
+
+        # Return connection with its current metadata
         result = await storage.get_connection_with_metadata(name)
         if result is None:
             raise RuntimeError("Failed to retrieve saved connection")
@@ -70,23 +84,55 @@ class DatabaseService:
 
     async def delete_connection(self, name: str) -> bool:
         """Delete a database connection."""
-        storage = await get_storage()
-        return await storage.delete_connection(name)
+        from src.services.pool import get_pool_manager
+        from src.services.refresh import get_refresh_service
+        from src.services.result_cache import get_result_cache
 
-    async def refresh_metadata(self, name: str) -> DatabaseConnectionDetail | None:
-        """Refresh metadata for a connection."""
+        storage = await get_storage()
+        deleted = await storage.delete_connection(name)
+        await get_refresh_service().cancel(name)
+        await get_pool_manager().close_pool(name)
+        get_result_cache().invalidate(name)
+        return deleted
+
+    async def refresh_metadata(
+        self,
+        name: str,
+        on_tables: Callable[[int], None] | None = None,
+        on_progress: Callable[[int], None] | None = None,
+        force: bool = False,
+    ) -> DatabaseConnectionDetail | None:
+        """
+        Refresh metadata for a connection.
+        Unless force is set, the schema signature is checked first and introspection
+        is skipped when it matches the one recorded at the last refresh.
+        on_tables receives the number of tables once fetched, and on_progress the
+        number saved so far as batches are written; neither is called when the
+        refresh is skipped.
+        """
         from src.services.metadata import MetadataService
+        from src.services.result_cache import get_result_cache
 
         storage = await get_storage()
         url = await storage.get_connection_url(name)
         if url is None:
             return None
 
-        # Parse URL and fetch metadata
+        # Parse URL and check whether the schema changed since the last refresh.
+        # The signature is taken before introspection, so DDL that lands in
+        # between is picked up by the next refresh.
         parsed = parse_db_url(url)
         metadata_service = MetadataService()
+        signature = await metadata_service.fetch_schema_signature(url, parsed["db_type"])
+        if not force and signature == await storage.get_schema_signature(name):
+            return await storage.get_connection_with_metadata(name)
+
         tables = await metadata_service.fetch_metadata(url, parsed["db_type"])
-        await storage.save_metadata(name, tables)
+        if on_tables is not None:
+            on_tables(len(tables))
+        if await storage.save_metadata(name, tables, on_progress):
+            get_result_cache().invalidate(name)
+        await storage.set_schema_signature(name, signature)
 
         return await storage.get_connection_with_metadata(name)
 
@@ -3,41 +3,119 @@
 import csv
 import json
 import io
+import time
+from collections.abc import AsyncIterator
 from typing import Any
 
-from src.models.query import QueryResult
+from src.models.query import Column
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard library encoder
+    orjson = None
+
+# Accept header value selecting the compact column-major /query response
+COLUMNAR_MEDIA_TYPE = "application/vnd.dbquery.columnar+json"
 
 
 class ExportService:
     """Service for exporting query results."""
 
-    def export_csv(self, result: QueryResult) -> str:
-        """Export query result to CSV format."""
+    async def stream_csv(
+        self, batches: AsyncIterator[tuple[list[Column], list[list]]]
+    ) -> AsyncIterator[str]:
+        """Encode streamed result batches as CSV, one chunk per batch."""
         output = io.StringIO()
         writer = csv.writer(output)
-
-        # Write header
-        writer.writerow([col.name for col in result.columns])
-
-        # Write data rows
-        for row in result.rows:
-            writer.writerow([self._format_csv_value(val) for val in row])
-
-        return output.getvalue()
-
-    def export_json(self, result: QueryResult) -> str:
-        """Export query result to JSON format."""
-        # Convert to list of dictionaries
-        data = []
-        column_names = [col.name for col in result.columns]
-
-        for row in result.rows:
-            record = {}
-            for i, value in enumerate(row):
-                record[column_names[i]] = value
-            data.append(record)
-
-        return json.dumps(data, ensure_ascii=False, indent=2, default=str)
+        header_sent = False
+
+        async for columns, rows in batches:
+            if not header_sent:
+                writer.writerow([col.name for col in columns])
+                header_sent = True
+            writer.writerows([self._format_csv_value(val) for val in row] for row in rows)
+
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+
+    async def stream_json(
+        self, batches: AsyncIterator[tuple[list[Column], list[list]]]
+    ) -> AsyncIterator[str]:
+        """Encode streamed result batches as a JSON array of objects, one chunk per batch."""
+        column_names: list[str] | None = None
+        has_rows = False
+
+        yield "["
+        async for columns, rows in batches:
+            if column_names is None:
+                column_names = [col.name for col in columns]
+            if not rows:
+                continue
+            chunk = ",\n  ".join(
+                json.dumps(dict(zip(column_names, row)), ensure_ascii=False, default=str)
+                for row in rows
+            )
+            yield (",\n  " if has_rows else "\n  ") + chunk
+            has_rows = True
+        yield "\n]" if has_rows else "]"
+
+    async def stream_ndjson(
+        self, batches: AsyncIterator[tuple[list[Column], list[list]]]
+    ) -> AsyncIterator[str]:
+        """
+        Encode streamed result batches as NDJSON.
+        The first line holds the columns, each following line is one row as an array,
+        and the last line is a summary (or an error, since the status is already sent).
+        """
+        start_time = time.time()
+        row_count = 0
+        header_sent = False
+        try:
+            async for columns, rows in batches:
+                if not header_sent:
+                    header = {"columns": [col.model_dump(by_alias=True) for col in columns]}
+                    yield json.dumps(header, ensure_ascii=False) + "\n"
+                    header_sent = True
+                if rows:
+                    yield "".join(
+                        json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows
+                    )
+                    row_count += len(rows)
+        except Exception as e:
+            yield json.dumps({"error": f"查询执行失败: {str(e)}"}, ensure_ascii=False) + "\n"
+            return
+
+        execution_time = (time.time() - start_time) * 1000
+        yield json.dumps({"rowCount": row_count, "executionTime": round(execution_time, 2)}) + "\n"
+
+    def encode_columnar(self, result: dict[str, Any]) -> bytes:
+        """
+        Encode a raw query result as compact column-major JSON.
+        "data" holds one array per column, in the order of "columns".
+        """
+        columns = result["columns"]
+        rows = result["rows"]
+        if rows:
+            data = [list(values) for values in zip(*rows)]
+        else:
+            data = [[] for _ in columns]
+
+        payload = {
+            "columns": [{"name": col.name, "type": col.type} for col in columns],
+            "data": data,
+            "rowCount": result["row_count"],
+            "executionTime": result["execution_time"],
+            "truncated": result["truncated"],
+            "cached": result.get("cached", False),
+            "cacheAge": result.get("cache_age"),
+            "nextPageToken": result.get("next_page_token"),
+        }
+        if orjson is not None:
+            return orjson.dumps(payload, default=str)
+        return json.dumps(
+            payload, ensure_ascii=False, separators=(",", ":"), default=str
+        ).encode("utf-8")
 
     def _format_csv_value(self, value: Any) -> str:
         """Format a value for CSV output."""
@@ -1,7 +1,9 @@
 """LLM service for natural language to SQL generation."""
 
+import logging
 import re
 import json
+from collections import OrderedDict
 from typing import Any
 import httpx
 from openai import AsyncOpenAI
@@ -9,6 +11,16 @@ from openai import AsyncOpenAI
 from src.config import get_settings
 from src.models.llm import LlmModel, NaturalQueryRequest, NaturalQueryResult
 from src.models.database import DatabaseConnectionDetail, TableMetadata
+from src.services.schema_index import SchemaIndex
+from src.storage.sqlite import get_storage
+
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:  # optional, HTTP/1.1 keep-alive is used without it
+    _HTTP2 = False
+
+logger = logging.getLogger(__name__)
 
 
 # Available LLM models
@@ -26,25 +38,86 @@ AVAILABLE_MODELS: list[LlmModel] = [
 ]
 
 
-def _build_metadata_context(database: DatabaseConnectionDetail) -> str:
-    """Build metadata context string for LLM prompt."""
-    lines = [f"数据库类型: {database.db_type}"]
-    lines.append(f"数据库名: {database.name}")
-    lines.append("")
-    lines.append("表结构:")
+def _render_header(database: DatabaseConnectionDetail) -> str:
+    """Render the database part of the metadata context."""
+    return f"数据库类型: {database.db_type}\n数据库名: {database.name}\n\n表结构:"
 
-    for table in database.tables:
-        table_type = "视图" if table.table_type == "view" else "表"
-        lines.append(f"\n{table_type}: {table.table_name}")
-        lines.append("字段:")
-        for field in table.fields:
-            nullable = "可空" if field.is_nullable else "非空"
-            chinese = f" ({field.chinese_name})" if field.chinese_name else ""
-            lines.append(f"  - {field.field_name}: {field.data_type} [{nullable}]{chinese}")
 
+def _render_table(table: TableMetadata) -> str:
+    """Render one table of the metadata context, to append to the header."""
+    table_type = "视图" if table.table_type == "view" else "表"
+    lines = ["", "", f"{table_type}: {table.table_name}", "字段:"]
+    for field in table.fields:
+        nullable = "可空" if field.is_nullable else "非空"
+        chinese = f" ({field.chinese_name})" if field.chinese_name else ""
+        lines.append(f"  - {field.field_name}: {field.data_type} [{nullable}]{chinese}")
     return "\n".join(lines)
 
 
+def _estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, one per four other characters."""
+    cjk = sum(1 for ch in text if "\u4e00" <= ch <= "\u9fff")
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+class MetadataContext:
+    """
+    Prompt material for one schema version of a connection: the relevance index
+    and the rendered header and table fragments, so that prompts for the same
+    metadata are assembled without touching storage or re-rendering tables.
+    """
+
+    # Rendered table selections kept per context
+    _MAX_RENDERED = 64
+
+    def __init__(self, version: int, database: DatabaseConnectionDetail) -> None:
+        self.version = version
+        self.database = database
+        self.index = SchemaIndex(database.tables)
+        self._header = _render_header(database)
+        self._fragments = [_render_table(table) for table in database.tables]
+        self._fragment_tokens = [_estimate_tokens(fragment) for fragment in self._fragments]
+        self.full_tokens = _estimate_tokens("".join([self._header, *self._fragments]))
+        # table positions -> (context, estimated tokens)
+        self._rendered: OrderedDict[tuple[int, ...], tuple[str, int]] = OrderedDict()
+
+    def select(self, query: str, top_k: int, max_tokens: int) -> list[int]:
+        """
+        Get the positions of the tables to describe in the prompt for a query.
+        Schemas that fit in max_tokens are sent whole. Larger ones are narrowed to
+        the tables relevant to the query; if nothing matches (e.g. a Chinese request
+        against unannotated English names), tables are taken in order up to the budget.
+        """
+        docs = list(range(len(self._fragments)))
+        if self.full_tokens <= max_tokens:
+            return docs
+
+        relevant = self.index.rank(query, top_k)
+        if relevant:
+            return relevant
+
+        budget = max_tokens - _estimate_tokens(self._header)
+        for count, tokens in enumerate(self._fragment_tokens):
+            budget -= tokens
+            if budget < 0:
+                return docs[:count]
+        return docs
+
+    def render(self, docs: list[int]) -> tuple[str, int]:
+        """Get the context for the tables at the given positions, and its estimated tokens."""
+        key = tuple(docs)
+        entry = self._rendered.get(key)
+        if entry is None:
+            text = "".join([self._header, *(self._fragments[doc] for doc in docs)])
+            entry = (text, _estimate_tokens(text))
+            self._rendered[key] = entry
+            if len(self._rendered) > self._MAX_RENDERED:
+                self._rendered.popitem(last=False)
+        else:
+            self._rendered.move_to_end(key)
+        return entry
+
+
 def _build_prompt(user_query: str, metadata_context: str) -> str:
     """Build the full prompt for SQL generation."""
     return f"""你是一个专业的数据库查询助手。根据用户的自然语言描述，生成对应的 SQL 查询语句。
@@ -101,6 +174,11 @@ class LlmService:
 
     def __init__(self) -> None:
         self.settings = get_settings()
+        # connection name -> context of the last schema version seen
+        self._contexts: dict[str, MetadataContext] = {}
+        # Provider clients, created on first use and shared by all requests
+        self._http_client: httpx.AsyncClient | None = None
+        self._moonshot_client: AsyncOpenAI | None = None
 
     def get_available_models(self) -> list[LlmModel]:
         """Get list of available LLM models."""
@@ -112,10 +190,29 @@ class LlmService:
             models.extend([m for m in AVAILABLE_MODELS if m.provider == "moonshot"])
         return models
 
+    async def get_metadata_context(self, name: str) -> MetadataContext | None:
+        """
+        Get the prompt material for a connection, or None if it does not exist.
+        Metadata is only loaded and rendered again after its schema version changed.
+        """
+        storage = await get_storage()
+        version = storage.schema_version(name)
+        context = self._contexts.get(name)
+        if context is not None and context.version == version:
+            return context
+
+        database = await storage.get_connection_with_metadata(name)
+        if database is None:
+            self._contexts.pop(name, None)
+            return None
+        context = MetadataContext(version, database)
+        self._contexts[name] = context
+        return context
+
     async def generate_sql(
         self,
         request: NaturalQueryRequest,
-        database: DatabaseConnectionDetail,
+        context: MetadataContext,
     ) -> NaturalQueryResult:
         """Generate SQL from natural language query."""
         # Find the model
@@ -123,9 +220,19 @@ class LlmService:
         if model is None:
             raise ValueError(f"未知的模型: {request.model_id}")
 
-        # Build prompt
-        metadata_context = _build_metadata_context(database)
+        # Build prompt from the whole schema, or the tables relevant to the request
+        database = context.database
+        docs = context.select(
+            request.prompt, self.settings.llm_context_top_k, self.settings.llm_context_max_tokens
+        )
+        metadata_context, context_tokens = context.render(docs)
         prompt = _build_prompt(request.prompt, metadata_context)
+        prompt_tokens = _estimate_tokens(prompt)
+        full_prompt_tokens = prompt_tokens - context_tokens + context.full_tokens
+        logger.info(
+            f"Prompt for '{database.name}': {len(docs)}/{len(database.tables)} tables, "
+            f"~{prompt_tokens} tokens (~{full_prompt_tokens} with all tables)"
+        )
 
         # Call LLM
         if model.provider == "dashscope":
@@ -142,42 +249,77 @@ class LlmService:
             sql=sql,
             explanation=explanation,
             model_id=request.model_id,
+            context_tables=len(docs),
+            prompt_tokens=prompt_tokens,
+            full_prompt_tokens=full_prompt_tokens,
         )
 
+    async def close(self) -> None:
+        """Close the provider clients and their pooled connections."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._moonshot_client = None
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """
+        Get the HTTP client shared by all LLM calls.
+        Connections are kept alive between calls, over HTTP/2 if h2 is installed.
+        """
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                http2=_HTTP2,
+                timeout=self._timeout(),
+                limits=httpx.Limits(
+                    max_connections=self.settings.llm_max_connections,
+                    max_keepalive_connections=self.settings.llm_max_keepalive_connections,
+                    keepalive_expiry=self.settings.llm_keepalive_expiry,
+                ),
+            )
+        return self._http_client
+
+    def _get_moonshot_client(self) -> AsyncOpenAI:
+        """Get the Moonshot client, on top of the shared HTTP client."""
+        if self._moonshot_client is None:
+            self._moonshot_client = AsyncOpenAI(
+                api_key=self.settings.moonshot_api_key,
+                base_url=self.settings.moonshot_base_url,
+                timeout=self._timeout(),
+                http_client=self._get_http_client(),
+            )
+        return self._moonshot_client
+
+    def _timeout(self) -> httpx.Timeout:
+        """Timeout for LLM calls."""
+        return httpx.Timeout(self.settings.llm_timeout, connect=self.settings.llm_connect_timeout)
+
     async def _call_dashscope(self, model_id: str, prompt: str) -> str:
         """Call Dashscope (通义千问) API."""
         if not self.settings.dashscope_api_key:
             raise ValueError("未配置 DASHSCOPE_API_KEY")
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://dashscope.aliyuncs.com/compatible-mode/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.settings.dashscope_api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": model_id,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.1,
-                },
-                timeout=60.0,
-            )
-            response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"]
+        response = await self._get_http_client().post(
+            f"{self.settings.dashscope_base_url.rstrip('/')}/chat/completions",
+            headers={
+                "Authorization": f"Bearer {self.settings.dashscope_api_key}",
+                "Content-Type": "application/json",
+            },
+            json={
+                "model": model_id,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": 0.1,
+            },
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data["choices"][0]["message"]["content"]
 
     async def _call_moonshot(self, model_id: str, prompt: str) -> str:
         """Call Moonshot (Kimi) API using OpenAI SDK."""
         if not self.settings.moonshot_api_key:
             raise ValueError("未配置 MOONSHOT_API_KEY")
 
-        client = AsyncOpenAI(
-            api_key=self.settings.moonshot_api_key,
-            base_url="https://api.moonshot.cn/v1",
-        )
-
-        response = await client.chat.completions.create(
+        response = await self._get_moonshot_client().chat.completions.create(
             model=model_id,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.1,
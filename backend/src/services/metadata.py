@@ -6,6 +6,39 @@ import aiomysql
 
 from src.services.database import parse_db_url
 
+# Hash of every table and column definition in the public schema, from the catalogs
+_POSTGRES_SIGNATURE_SQL = """
+    SELECT md5(coalesce(string_agg(
+        concat_ws(':', c.relname, c.relkind, a.attnum, a.attname, a.atttypid,
+                  a.atttypmod, a.attnotnull, pg_get_expr(d.adbin, d.adrelid)),
+        ',' ORDER BY c.relname, a.attnum
+    ), ''))
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    LEFT JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+    LEFT JOIN pg_attrdef d ON d.adrelid = c.oid AND d.adnum = a.attnum
+    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p', 'v', 'f')
+"""
+
+# Order-independent checksums of table and column definitions; GROUP_CONCAT would
+# be cut off at group_concat_max_len on large schemas
+_MYSQL_SIGNATURE_SQL = """
+    SELECT CONCAT_WS('-',
+        (SELECT CONCAT_WS(':', COUNT(*),
+                          BIT_XOR(CRC32(CONCAT_WS(':', table_name, table_type))),
+                          SUM(CRC32(CONCAT_WS(':', table_name, table_type))))
+         FROM information_schema.tables
+         WHERE table_schema = DATABASE()),
+        (SELECT CONCAT_WS(':', COUNT(*),
+                          BIT_XOR(CRC32(CONCAT_WS(':', table_name, ordinal_position, column_name,
+                                                  column_type, is_nullable, column_default))),
+                          SUM(CRC32(CONCAT_WS(':', table_name, ordinal_position, column_name,
+                                              column_type, is_nullable, column_default))))
+         FROM information_schema.columns
+         WHERE table_schema = DATABASE())
+    )
+"""
+
 
 class MetadataService:
     """Service for extracting database metadata."""
@@ -17,56 +50,74 @@ class MetadataService:
         else:
             return await self._fetch_mysql_metadata(url)
 
+    async def fetch_schema_signature(self, url: str, db_type: str) -> str:
+        """
+        Get a checksum of the schema's table and column definitions with one
+        lightweight query, to tell whether a metadata refresh would change anything.
+        """
+        if db_type == "postgres":
+            conn = await asyncpg.connect(url)
+            try:
+                return await conn.fetchval(_POSTGRES_SIGNATURE_SQL)
+            finally:
+                await conn.close()
+
+        parsed = parse_db_url(url)
+        conn = await aiomysql.connect(
+            host=parsed["host"],
+            port=parsed["port"],
+            user=parsed["user"],
+            password=parsed["password"],
+            db=parsed["database"],
+        )
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute(_MYSQL_SIGNATURE_SQL)
+                row = await cursor.fetchone()
+                return row[0] or ""
+        finally:
+            conn.close()
+
     async def _fetch_postgres_metadata(self, url: str) -> list[dict[str, Any]]:
         """Fetch metadata from PostgreSQL database."""
         conn = await asyncpg.connect(url)
         try:
             # Get tables and views
-            tables_query = """
+            table_rows = await conn.fetch("""
                 SELECT table_name, table_type
                 FROM information_schema.tables
                 WHERE table_schema = 'public'
                 ORDER BY table_name
-            """
-            table_rows = await conn.fetch(tables_query)
-
-            tables = []
-            for table_row in table_rows:
-                table_name = table_row["table_name"]
-                table_type = "TABLE" if table_row["table_type"] == "BASE TABLE" else "VIEW"
-
-                # Get columns for this table
-                columns_query = """
-                    SELECT
-                        column_name,
-                        data_type,
-                        is_nullable,
-                        column_default,
-                        character_maximum_length
-                    FROM information_schema.columns
-                    WHERE table_schema = 'public' AND table_name = $1
-                    ORDER BY ordinal_position
-                """
-                column_rows = await conn.fetch(columns_query, table_name)
-
-                fields = [
-                    {
-                        "field_name": col["column_name"],
-                        "data_type": col["data_type"],
-                        "is_nullable": col["is_nullable"] == "YES",
-                        "column_default": col["column_default"],
-                        "max_length": col["character_maximum_length"],
-                    }
+            """)
+
+            # Get all columns of the schema in one round trip
+            column_rows = await conn.fetch("""
+                SELECT
+                    table_name,
+                    column_name,
+                    data_type,
+                    is_nullable,
+                    column_default,
+                    character_maximum_length
+                FROM information_schema.columns
+                WHERE table_schema = 'public'
+                ORDER BY table_name, ordinal_position
+            """)
+
+            return _group_columns(
+                [(row["table_name"], row["table_type"]) for row in table_rows],
+                [
+                    (
+                        col["table_name"],
+                        col["column_name"],
+                        col["data_type"],
+                        col["is_nullable"],
+                        col["column_default"],
+                        col["character_maximum_length"],
+                    )
                     for col in column_rows
-                ]
-
-                tables.append({
-                    "table_name": table_name,
-                    "table_type": table_type,
-                    "fields": fields,
-                })
-
-            return tables
+                ],
+            )
         finally:
             await conn.close()
 
@@ -82,7 +133,7 @@ class MetadataService:
             db=parsed["database"],
         )
         try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+            async with conn.cursor() as cursor:
                 # Get tables and views
                 await cursor.execute("""
                     SELECT table_name, table_type
@@ -92,42 +143,49 @@ class MetadataService:
                 """)
                 table_rows = await cursor.fetchall()
 
-                tables = []
-                for table_row in table_rows:
-                    table_name = table_row["TABLE_NAME"]
-                    table_type = "TABLE" if table_row["TABLE_TYPE"] == "BASE TABLE" else "VIEW"
-
-                    # Get columns for this table
-                    await cursor.execute("""
-                        SELECT
-                            column_name,
-                            data_type,
-                            is_nullable,
-                            column_default,
-                            character_maximum_length
-                        FROM information_schema.columns
-                        WHERE table_schema = DATABASE() AND table_name = %s
-                        ORDER BY ordinal_position
-                    """, (table_name,))
-                    column_rows = await cursor.fetchall()
-
-                    fields = [
-                        {
-                            "field_name": col["COLUMN_NAME"],
-                            "data_type": col["DATA_TYPE"],
-                            "is_nullable": col["IS_NULLABLE"] == "YES",
-                            "column_default": col["COLUMN_DEFAULT"],
-                            "max_length": col["CHARACTER_MAXIMUM_LENGTH"],
-                        }
-                        for col in column_rows
-                    ]
-
-                    tables.append({
-                        "table_name": table_name,
-                        "table_type": table_type,
-                        "fields": fields,
-                    })
-
-                return tables
+                # Get all columns of the schema in one round trip
+                await cursor.execute("""
+                    SELECT
+                        table_name,
+                        column_name,
+                        data_type,
+                        is_nullable,
+                        column_default,
+                        character_maximum_length
+                    FROM information_schema.columns
+                    WHERE table_schema = DATABASE()
+                    ORDER BY table_name, ordinal_position
+                """)
+                column_rows = await cursor.fetchall()
+
+                return _group_columns(table_rows, column_rows)
         finally:
             conn.close()
+
+
+def _group_columns(
+    table_rows: list[tuple], column_rows: list[tuple]
+) -> list[dict[str, Any]]:
+    """
+    Group column rows under their tables.
+    table_rows: (table_name, table_type)
+    column_rows: (table_name, column_name, data_type, is_nullable, column_default, max_length)
+    """
+    fields_by_table: dict[str, list[dict[str, Any]]] = {}
+    for table_name, column_name, data_type, is_nullable, column_default, max_length in column_rows:
+        fields_by_table.setdefault(table_name, []).append({
+            "field_name": column_name,
+            "data_type": data_type,
+            "is_nullable": is_nullable == "YES",
+            "column_default": column_default,
+            "max_length": max_length,
+        })
+
+    return [
+        {
+            "table_name": table_name,
+            "table_type": "TABLE" if table_type == "BASE TABLE" else "VIEW",
+            "fields": fields_by_table.get(table_name, []),
+        }
+        for table_name, table_type in table_rows
+    ]
@@ -0,0 +1,183 @@
+"""Paging of SELECT statements with opaque continuation tokens."""
+
+import base64
+import hashlib
+import json
+from typing import Any
+
+from sqlglot import exp
+
+from src.models.query import Column
+
+# Column types whose serialized values compare correctly as SQL literals
+_KEYSET_TYPES = {"integer", "number", "decimal", "string", "datetime", "date", "uuid"}
+
+
+def plan_page(
+    statement: exp.Select, dialect: str, page_size: int, token: str | None
+) -> tuple[exp.Select, dict[str, Any]]:
+    """
+    Build the statement for one page of a validated SELECT.
+    Returns (page_statement, plan); pass the plan to next_page_token() with the page rows.
+
+    Pages are fetched with outer LIMIT/OFFSET, one row past page_size to tell whether
+    another page exists. When the query is ordered by a single output column, later
+    pages use a keyset predicate on that column instead of OFFSET, so the database
+    does not scan past every earlier page. A LIMIT/OFFSET in the SQL itself bounds
+    the rows paged through.
+    Raises ValueError for a token that is malformed or belongs to another query.
+    """
+    fingerprint = _query_fingerprint(statement, dialect)
+    state = _decode_token(token, fingerprint) if token else {"o": 0}
+    offset = state["o"]
+
+    page = statement.copy()
+    user_offset = _literal_int(page.args.get("offset"), "OFFSET")
+    user_limit = _literal_int(page.args.get("limit"), "LIMIT")
+
+    fetch = page_size + 1
+    if user_limit is not None:
+        fetch = max(0, min(fetch, user_limit - offset))
+
+    keyset = _keyset_column(page) if user_limit is None and user_offset is None else None
+    if keyset is not None and "k" in state:
+        page = page.where(_keyset_predicate(keyset, state["k"]), copy=False)
+    else:
+        skip = (user_offset or 0) + offset
+        page.set("offset", None)
+        if skip:
+            page = page.offset(skip, copy=False)
+
+    page.set("limit", None)
+    page = page.limit(fetch, copy=False)
+
+    plan = {
+        "fingerprint": fingerprint,
+        "offset": offset,
+        "page_size": page_size,
+        "keyset": keyset,
+    }
+    return page, plan
+
+
+def next_page_token(plan: dict[str, Any], columns: list[Column], rows: list[list]) -> str | None:
+    """
+    Get the token for the page after the given rows, or None on the last page.
+    rows is the page as fetched, including the look-ahead row.
+    """
+    page_size = plan["page_size"]
+    if len(rows) <= page_size:
+        return None
+
+    state: dict[str, Any] = {"o": plan["offset"] + page_size}
+    keyset = plan["keyset"]
+    if keyset is not None:
+        index = next((i for i, col in enumerate(columns) if col.name == keyset["name"]), None)
+        if index is not None and columns[index].type in _KEYSET_TYPES:
+            last, ahead = rows[page_size - 1][index], rows[page_size][index]
+            # Ties across the page boundary would be skipped by the predicate, and
+            # NULL does not compare; fall back to OFFSET for the next page
+            if last is not None and last != ahead:
+                state["k"] = last
+
+    state["f"] = plan["fingerprint"]
+    payload = json.dumps(state, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def _query_fingerprint(statement: exp.Select, dialect: str) -> str:
+    """Short hash of the normalized query, to tie tokens to the query they came from."""
+    normalized = f"{dialect}:{statement.sql(dialect=dialect)}"
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _decode_token(token: str, fingerprint: str) -> dict[str, Any]:
+    """Decode a continuation token and check it belongs to the query."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(state, dict) or not isinstance(state.get("o"), int) or state["o"] < 0:
+            raise ValueError
+    except ValueError:
+        raise ValueError("无效的分页令牌") from None
+    if state.get("f") != fingerprint:
+        raise ValueError("分页令牌与当前查询不匹配")
+    return state
+
+
+def _literal_int(node: exp.Expression | None, clause: str) -> int | None:
+    """Get the integer of a LIMIT/FETCH/OFFSET clause, or None if absent."""
+    if node is None:
+        return None
+    value = node.args.get("count") if isinstance(node, exp.Fetch) else node.expression
+    if isinstance(value, exp.Literal) and not value.is_string:
+        return int(value.this)
+    raise ValueError(f"分页查询只支持常量 {clause}")
+
+
+def _keyset_column(statement: exp.Select) -> dict[str, Any] | None:
+    """
+    Get the ORDER BY column usable for keyset paging, or None.
+    Requires a single plain column that is the only output column with its name,
+    so the token records its value and not another column's, and no window
+    functions, whose results a WHERE predicate would change.
+    """
+    order = statement.args.get("order")
+    if order is None or len(order.expressions) != 1 or statement.find(exp.Window):
+        return None
+
+    ordered = order.expressions[0]
+    column = ordered.this
+    if not isinstance(column, exp.Column):
+        return None
+
+    # With a join, a star or a differently qualified column may output another
+    # table's column under the same name
+    single_source = not statement.args.get("joins")
+    stars = [p for p in statement.expressions if _is_star(p)]
+    matches = [p for p in statement.expressions if p.alias_or_name == column.name]
+    if stars:
+        if not single_source or matches:
+            return None
+    elif len(matches) != 1 or not _same_column(
+        matches[0].unalias() if isinstance(matches[0], exp.Alias) else matches[0],
+        column,
+        single_source,
+    ):
+        # An output alias with the column's name would also shadow it in ORDER BY
+        return None
+
+    return {
+        "name": column.name,
+        "column": column,
+        "descending": bool(ordered.args.get("desc")),
+        # sqlglot resolves the dialect's default NULL ordering when parsing
+        "nulls_last": not ordered.args.get("nulls_first"),
+    }
+
+
+def _is_star(projection: exp.Expression) -> bool:
+    """Check whether a projection is `*` or `table.*`."""
+    return isinstance(projection, exp.Star) or (
+        isinstance(projection, exp.Column) and isinstance(projection.this, exp.Star)
+    )
+
+
+def _same_column(projection: exp.Expression, column: exp.Column, single_source: bool) -> bool:
+    """Check whether an output expression is the ordered column itself."""
+    if not isinstance(projection, exp.Column) or projection.name != column.name:
+        return False
+    if projection.table == column.table:
+        return True
+    # Without a join, a qualified and an unqualified reference are the same column
+    return single_source and not (projection.table and column.table)
+
+
+def _keyset_predicate(keyset: dict[str, Any], value: Any) -> exp.Expression:
+    """Predicate selecting the rows that sort after value."""
+    column = keyset["column"].copy()
+    literal = exp.convert(value)
+    predicate = column.copy() < literal if keyset["descending"] else column.copy() > literal
+    if keyset["nulls_last"]:
+        predicate = exp.or_(predicate, column.is_(exp.null()))
+    return predicate
@@ -0,0 +1,248 @@
+"""Connection pool registry for target databases."""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import aiomysql
+import asyncpg
+
+from src.config import get_settings
+from src.services.database import parse_db_url
+
+logger = logging.getLogger(__name__)
+
+# Errors that indicate the pooled connection (or the server behind it) is gone.
+# Not OSError as a whole: it includes TimeoutError, which is how statement
+# timeouts surface, and those leave the connection usable. Not asyncpg's
+# InterfaceError either: its DataError subclass is raised client-side for a bad
+# bind value, before anything is sent to the server.
+_CONNECTION_ERRORS: tuple[type[BaseException], ...] = (
+    asyncpg.exceptions.ConnectionDoesNotExistError,
+    asyncpg.exceptions.CannotConnectNowError,
+    ConnectionError,
+)
+
+# MySQL client error codes for a lost or unreachable server; other
+# OperationalErrors (unknown column, statement timeout, ...) leave the pool intact
+_MYSQL_CONNECTION_ERROR_CODES = {2003, 2006, 2013, 2055}
+
+
+def _is_connection_error(exc: BaseException) -> bool:
+    """Check whether an error means the connection is no longer usable."""
+    if isinstance(exc, aiomysql.OperationalError):
+        return bool(exc.args) and exc.args[0] in _MYSQL_CONNECTION_ERROR_CODES
+    return isinstance(exc, _CONNECTION_ERRORS)
+
+
+class PoolManager:
+    """Registry of lazily created connection pools, keyed by connection name."""
+
+    def __init__(self) -> None:
+        self.settings = get_settings()
+        # name -> {"url": str, "db_type": str, "pool": asyncpg.Pool | aiomysql.Pool}
+        self._pools: dict[str, dict[str, Any]] = {}
+        # Per-name locks, so a slow or unreachable target only holds up its own pool
+        self._locks: dict[str, asyncio.Lock] = {}
+        # (name, server connection id) -> when the connection was last released
+        self._released_at: dict[tuple[str, int], float] = {}
+
+    async def get_pool(self, name: str, url: str) -> Any:
+        """Get the pool for a connection, creating or replacing it as needed."""
+        entry = self._pools.get(name)
+        if entry is not None and entry["url"] == url and not self._is_closed(entry):
+            return entry["pool"]
+
+        async with self._lock(name):
+            # Re-check after acquiring the lock, another task may have created it
+            entry = self._pools.get(name)
+            if entry is not None:
+                if entry["url"] == url and not self._is_closed(entry):
+                    return entry["pool"]
+                # URL changed or pool is unusable, replace it
+                self._pools.pop(name, None)
+                await self._close_entry(name, entry)
+
+            parsed = parse_db_url(url)
+            pool = await self._create_pool(url, parsed)
+            self._pools[name] = {"url": url, "db_type": parsed["db_type"], "pool": pool}
+            logger.info(f"Created {parsed['db_type']} connection pool for '{name}'")
+            return pool
+
+    @asynccontextmanager
+    async def acquire(self, name: str, url: str) -> AsyncIterator[Any]:
+        """
+        Acquire a connection from the pool for a connection name.
+        A connection that has been idle longer than settings.pool_health_check_idle
+        is checked first; one that turns out to be broken is dropped on its own,
+        leaving the rest of the pool and the queries running on it alone.
+        """
+        pool = await self.get_pool(name, url)
+        conn = await self._acquire_healthy(name, pool)
+
+        broken = False
+        try:
+            yield conn
+        except Exception as e:
+            broken = _is_connection_error(e)
+            raise
+        finally:
+            await self._release(name, pool, conn, broken)
+
+    async def kill_mysql_query(self, url: str, thread_id: int) -> None:
+        """
+        Stop the statement running on a MySQL connection with KILL QUERY.
+        Uses a separate short-lived connection, since the pool may be exhausted.
+        """
+        parsed = parse_db_url(url)
+        conn = await aiomysql.connect(
+            host=parsed["host"],
+            port=parsed["port"],
+            user=parsed["user"],
+            password=parsed["password"],
+            db=parsed["database"],
+            connect_timeout=self.settings.pool_close_timeout,
+        )
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute("KILL QUERY %s", (thread_id,))
+        finally:
+            conn.close()
+
+    async def close_pool(self, name: str) -> None:
+        """Close and remove the pool for a connection name, if any."""
+        async with self._lock(name):
+            entry = self._pools.pop(name, None)
+            if entry is not None:
+                await self._close_entry(name, entry)
+
+    async def close_all(self) -> None:
+        """Close all pools."""
+        for name in list(self._pools):
+            await self.close_pool(name)
+
+    def _lock(self, name: str) -> asyncio.Lock:
+        """Get the lock guarding creation and replacement of a name's pool."""
+        return self._locks.setdefault(name, asyncio.Lock())
+
+    async def _create_pool(self, url: str, parsed: dict[str, Any]) -> Any:
+        """Create a new pool for the given database."""
+        if parsed["db_type"] == "postgres":
+            return await asyncpg.create_pool(
+                url,
+                min_size=self.settings.pool_min_size,
+                max_size=self.settings.pool_max_size,
+                max_inactive_connection_lifetime=self.settings.pool_recycle,
+                statement_cache_size=self.settings.pg_statement_cache_size,
+            )
+        return await aiomysql.create_pool(
+            host=parsed["host"],
+            port=parsed["port"],
+            user=parsed["user"],
+            password=parsed["password"],
+            db=parsed["database"],
+            minsize=self.settings.pool_min_size,
+            maxsize=self.settings.pool_max_size,
+            pool_recycle=self.settings.pool_recycle,
+            autocommit=True,
+        )
+
+    async def _acquire_healthy(self, name: str, pool: Any) -> Any:
+        """Acquire a connection, replacing ones that fail the idle health check."""
+        timeout = self.settings.pool_acquire_timeout
+        while True:
+            if isinstance(pool, asyncpg.Pool):
+                conn = await pool.acquire(timeout=timeout)
+            else:
+                conn = await asyncio.wait_for(pool.acquire(), timeout=timeout)
+
+            released_at = self._released_at.pop((name, _connection_id(conn)), None)
+            idle = time.monotonic() - released_at if released_at is not None else 0.0
+            # Connections the pool just opened have no release time and are not checked
+            if released_at is None or idle < self.settings.pool_health_check_idle:
+                return conn
+            if await self._ping(conn):
+                return conn
+            logger.warning(f"Dropping dead connection from the pool for '{name}'")
+            await self._release(name, pool, conn, broken=True)
+
+    async def _ping(self, conn: Any) -> bool:
+        """Check that a connection still reaches the server."""
+        timeout = self.settings.pool_health_check_timeout
+        try:
+            if isinstance(conn, aiomysql.Connection):
+                await asyncio.wait_for(conn.ping(reconnect=False), timeout=timeout)
+            else:
+                await conn.execute("SELECT 1", timeout=timeout)
+        except Exception:
+            return False
+        return True
+
+    async def _release(self, name: str, pool: Any, conn: Any, broken: bool) -> None:
+        """Return a connection to its pool; a broken one is closed so the pool replaces it."""
+        key = (name, _connection_id(conn))
+        if broken:
+            if isinstance(pool, asyncpg.Pool):
+                conn.terminate()
+            else:
+                conn.close()
+            self._released_at.pop(key, None)
+        else:
+            now = time.monotonic()
+            self._released_at[key] = now
+            if len(self._released_at) > 4 * len(self._pools) * self.settings.pool_max_size:
+                self._forget_released(now - self.settings.pool_recycle)
+
+        if isinstance(pool, asyncpg.Pool):
+            await pool.release(conn)
+        else:
+            pool.release(conn)
+
+    def _forget_released(self, before: float) -> None:
+        """Forget release times older than the pools' recycle age."""
+        for key in [key for key, at in self._released_at.items() if at < before]:
+            del self._released_at[key]
+
+    def _is_closed(self, entry: dict[str, Any]) -> bool:
+        """Check whether a pool has been closed."""
+        pool = entry["pool"]
+        if isinstance(pool, asyncpg.Pool):
+            return pool.is_closing()
+        return pool.closed
+
+    async def _close_entry(self, name: str, entry: dict[str, Any]) -> None:
+        """Close a pool, falling back to terminating it if closing takes too long."""
+        pool = entry["pool"]
+        for key in [key for key in self._released_at if key[0] == name]:
+            del self._released_at[key]
+        try:
+            if isinstance(pool, asyncpg.Pool):
+                await asyncio.wait_for(pool.close(), timeout=self.settings.pool_close_timeout)
+            else:
+                pool.close()
+                await asyncio.wait_for(pool.wait_closed(), timeout=self.settings.pool_close_timeout)
+        except Exception as e:
+            logger.warning(f"Error closing connection pool for '{name}': {e}")
+            pool.terminate()
+
+
+def _connection_id(conn: Any) -> int:
+    """Server-side id of a pooled connection, stable across acquisitions."""
+    if isinstance(conn, aiomysql.Connection):
+        return conn.thread_id()
+    return conn.get_server_pid()
+
+
+# Global pool manager instance
+_pool_manager: PoolManager | None = None
+
+
+def get_pool_manager() -> PoolManager:
+    """Get pool manager instance."""
+    global _pool_manager
+    if _pool_manager is None:
+        _pool_manager = PoolManager()
+    return _pool_manager
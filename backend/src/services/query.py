@@ -1,81 +1,326 @@
 """Query service for SQL validation and execution."""
 
+import asyncio
+import json
+import logging
+import re
 import time
+from contextlib import aclosing
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from functools import lru_cache
+from collections.abc import AsyncIterator, Callable
 from typing import Any
 import sqlglot
 from sqlglot import exp
 import asyncpg
 import aiomysql
+from pymysql.constants import FIELD_TYPE
 
 from src.config import get_settings
 from src.models.query import QueryRequest, QueryResult, Column
 from src.services.database import parse_db_url
+from src.services.pagination import next_page_token, plan_page
+from src.services.pool import get_pool_manager
+from src.services.result_cache import get_result_cache
+from src.services.scheduler import get_scheduler
+from src.services.single_flight import SingleFlight
 from src.storage.sqlite import get_storage
 
+logger = logging.getLogger(__name__)
+
+# MySQL error raised when max_execution_time is exceeded
+_MYSQL_QUERY_TIMEOUT = 3024
+
+# Stands in for `?` placeholders while MySQL SQL is rendered for aiomysql's %s format
+_PYFORMAT_MARKER = "__dbquery_param__"
+
+# Raised when a statement cached on a pooled connection no longer matches the
+# target's schema, e.g. `SELECT *` after ALTER TABLE; asyncpg only recovers from
+# these by itself on its public execute paths
+_STALE_STATEMENT_ERRORS = (
+    asyncpg.exceptions.InvalidCachedStatementError,
+    asyncpg.exceptions.OutdatedSchemaCacheError,
+)
+
+# A PostgreSQL-style `$n` placeholder
+_POSTGRES_PARAM_RE = re.compile(r"\$\d+")
+
+# Value of a bind parameter
+Param = str | int | float | bool | None
+
+
+def _param_count(statement: exp.Expression, dialect: str) -> int:
+    """
+    Count the bind parameters a statement expects: `$1`, `$2`, ... for PostgreSQL
+    and `?` for MySQL. Raises ValueError for the other dialect's placeholder style.
+    """
+    if dialect == "postgres":
+        if statement.find(exp.Placeholder) is not None:
+            raise ValueError("PostgreSQL 参数占位符请使用 $1、$2 形式")
+        numbers = [int(p.name) for p in statement.find_all(exp.Parameter) if p.name.isdigit()]
+        return max(numbers, default=0)
+    # MySQL reads `$1` as a column name; `@name` user variables are left alone
+    for column in statement.find_all(exp.Column):
+        identifier = column.this
+        if isinstance(identifier, exp.Identifier) and not identifier.quoted:
+            if _POSTGRES_PARAM_RE.fullmatch(identifier.name):
+                raise ValueError("MySQL 参数占位符请使用 ? 形式")
+    return sum(1 for _ in statement.find_all(exp.Placeholder))
+
+
+def _render(statement: exp.Expression, dialect: str, param_count: int) -> str:
+    """
+    Render a statement for the driver.
+    aiomysql interpolates `%s` and needs literal `%` doubled when parameters are
+    bound, so MySQL placeholders are rewritten; asyncpg takes `$n` as is.
+    """
+    if dialect != "mysql" or not param_count:
+        return statement.sql(dialect=dialect)
+    marked = statement.transform(
+        lambda node: exp.var(_PYFORMAT_MARKER) if isinstance(node, exp.Placeholder) else node
+    )
+    return marked.sql(dialect=dialect).replace("%", "%%").replace(_PYFORMAT_MARKER, "%s")
+
+
+def _to_str(value: Any) -> Any:
+    """Serialize Decimal, timedelta and similar values as strings."""
+    return None if value is None else str(value)
+
+
+def _to_isoformat(value: Any) -> Any:
+    """Serialize date/time values; MySQL returns invalid dates as strings."""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def _to_hex(value: Any) -> Any:
+    """Serialize binary values as hex."""
+    return None if value is None else value.hex()
+
+
+def _to_text(value: Any) -> Any:
+    """Serialize text that may come back as bytes for binary collations."""
+    return value.hex() if isinstance(value, bytes) else value
+
+
+def _parse_bool(value: str) -> bool:
+    """Parse a boolean bind value written as true/false."""
+    lowered = value.lower()
+    if lowered not in ("true", "false"):
+        raise ValueError(value)
+    return lowered == "true"
+
+
+# PostgreSQL parameter type name -> parser for string bind values; asyncpg only
+# accepts strings for text-like parameters
+_POSTGRES_PARAM_PARSERS: dict[str, Callable[[str], Any]] = {
+    "int2": int,
+    "int4": int,
+    "int8": int,
+    "oid": int,
+    "float4": float,
+    "float8": float,
+    "numeric": Decimal,
+    "bool": _parse_bool,
+    "timestamp": datetime.fromisoformat,
+    "timestamptz": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "time": dt_time.fromisoformat,
+    "timetz": dt_time.fromisoformat,
+}
+
+
+def _postgres_params(params: list[Param] | None, parameter_types: Any) -> list:
+    """
+    Convert string bind values to the Python types asyncpg expects for the
+    statement's parameters, e.g. an ISO date string for a date parameter.
+    Raises ValueError naming the parameter if a value can't be converted.
+    """
+    values = list(params or ())
+    for index, (value, param_type) in enumerate(zip(values, parameter_types)):
+        parser = _POSTGRES_PARAM_PARSERS.get(param_type.name)
+        if parser is None or not isinstance(value, str):
+            continue
+        try:
+            values[index] = parser(value)
+        except (ValueError, ArithmeticError):
+            raise ValueError(
+                f"参数 ${index + 1} 无法转换为 {param_type.name} 类型: {value!r}"
+            ) from None
+    return values
+
+
+# Serializer for a column: None means values pass through unchanged
+Serializer = Callable[[Any], Any] | None
+
+# PostgreSQL type name -> (column type, serializer)
+_POSTGRES_TYPES: dict[str, tuple[str, Serializer]] = {
+    "int2": ("integer", None),
+    "int4": ("integer", None),
+    "int8": ("integer", None),
+    "oid": ("integer", None),
+    "float4": ("number", None),
+    "float8": ("number", None),
+    "numeric": ("decimal", _to_str),
+    "money": ("string", None),
+    "bool": ("boolean", None),
+    "text": ("string", None),
+    "varchar": ("string", None),
+    "bpchar": ("string", None),
+    "char": ("string", None),
+    "name": ("string", None),
+    "citext": ("string", None),
+    "json": ("json", None),
+    "jsonb": ("json", None),
+    "uuid": ("uuid", _to_str),
+    "timestamp": ("datetime", _to_isoformat),
+    "timestamptz": ("datetime", _to_isoformat),
+    "date": ("date", _to_isoformat),
+    "time": ("time", _to_isoformat),
+    "timetz": ("time", _to_isoformat),
+    "interval": ("interval", _to_str),
+    "bytea": ("binary", _to_hex),
+}
+
+# MySQL field type code -> (column type, serializer)
+_MYSQL_TYPES: dict[int, tuple[str, Serializer]] = {
+    FIELD_TYPE.TINY: ("integer", None),
+    FIELD_TYPE.SHORT: ("integer", None),
+    FIELD_TYPE.LONG: ("integer", None),
+    FIELD_TYPE.LONGLONG: ("integer", None),
+    FIELD_TYPE.INT24: ("integer", None),
+    FIELD_TYPE.YEAR: ("integer", None),
+    FIELD_TYPE.FLOAT: ("number", None),
+    FIELD_TYPE.DOUBLE: ("number", None),
+    FIELD_TYPE.DECIMAL: ("decimal", _to_str),
+    FIELD_TYPE.NEWDECIMAL: ("decimal", _to_str),
+    FIELD_TYPE.VARCHAR: ("string", _to_text),
+    FIELD_TYPE.VAR_STRING: ("string", _to_text),
+    FIELD_TYPE.STRING: ("string", _to_text),
+    FIELD_TYPE.ENUM: ("string", _to_text),
+    FIELD_TYPE.TINY_BLOB: ("string", _to_text),
+    FIELD_TYPE.MEDIUM_BLOB: ("string", _to_text),
+    FIELD_TYPE.LONG_BLOB: ("string", _to_text),
+    FIELD_TYPE.BLOB: ("string", _to_text),
+    FIELD_TYPE.JSON: ("json", _to_text),
+    FIELD_TYPE.DATETIME: ("datetime", _to_isoformat),
+    FIELD_TYPE.TIMESTAMP: ("datetime", _to_isoformat),
+    FIELD_TYPE.DATE: ("date", _to_isoformat),
+    FIELD_TYPE.NEWDATE: ("date", _to_isoformat),
+    FIELD_TYPE.TIME: ("time", _to_str),
+    FIELD_TYPE.BIT: ("binary", _to_hex),
+    FIELD_TYPE.NULL: ("null", None),
+}
+
+# MySQL field type code -> lowercase name, for types without a dedicated serializer
+_MYSQL_TYPE_NAMES = {
+    code: name.lower() for name, code in vars(FIELD_TYPE).items() if name.isupper()
+}
+
 
 class QueryService:
     """Service for SQL query validation and execution."""
 
     def __init__(self) -> None:
         self.settings = get_settings()
+        # LRU of (sql, dialect, limit) -> (is_valid, SQL or error, normalized SQL, param count)
+        self._prepare_cached = lru_cache(maxsize=self.settings.sql_cache_size)(self._prepare)
+        # Identical queries running at the same time share one database call
+        self._in_flight = SingleFlight()
+
+    def sql_cache_info(self) -> dict[str, int]:
+        """Get parsed-SQL cache counters."""
+        info = self._prepare_cached.cache_info()
+        return {"size": info.currsize, "hits": info.hits, "misses": info.misses}
+
+    def single_flight_info(self) -> dict[str, int]:
+        """Get query coalescing counters."""
+        return self._in_flight.stats()
+
+    def _prepare_checked(
+        self, sql: str, dialect: str, limit: int | None = None
+    ) -> tuple[str, str, int]:
+        """
+        Cached validation and rewrite.
+        Returns (sql_to_execute, normalized_sql, param_count); raises ValueError if not allowed.
+        """
+        if limit is None:
+            limit = self.settings.default_limit
 
-    def validate_sql(self, sql: str, dialect: str = "postgres") -> tuple[bool, str]:
+        is_valid, result, normalized, param_count = self._prepare_cached(sql, dialect, limit)
+        if not is_valid:
+            raise ValueError(result)
+        return result, normalized, param_count
+
+    def _prepare(self, sql: str, dialect: str, limit: int) -> tuple[bool, str, str, int]:
+        """
+        Parse, validate and rewrite SQL.
+        Returns (is_valid, sql_or_error, normalized_sql, param_count); the normalized
+        SQL is regenerated by sqlglot, so whitespace and keyword case do not matter.
+        """
+        statement, error = self._parse(sql, dialect)
+        if statement is None:
+            return False, error, "", 0
+        try:
+            param_count = _param_count(statement, dialect)
+        except ValueError as e:
+            return False, str(e), "", 0
+        # Render before LIMIT injection, which modifies the statement in place
+        normalized = statement.sql(dialect=dialect)
+        sql = self._limit_statement(sql, statement, dialect, limit)
+        if param_count and dialect == "mysql":
+            sql = _render(statement, dialect, param_count)
+        return True, sql, normalized, param_count
+
+    def _parse(self, sql: str, dialect: str) -> tuple[exp.Expression | None, str]:
         """
-        Validate SQL query.
-        Returns (is_valid, error_message).
-        Only SELECT statements are allowed.
+        Parse and validate SQL.
+        Returns (statement, error_message); statement is None if invalid.
         """
         try:
             # Parse the SQL
             statements = sqlglot.parse(sql, dialect=dialect)
 
             if not statements:
-                return False, "无法解析 SQL 语句"
+                return None, "无法解析 SQL 语句"
 
             if len(statements) > 1:
-                return False, "只允许执行单条 SQL 语句"
+                return None, "只允许执行单条 SQL 语句"
 
             statement = statements[0]
 
             if statement is None:
-                return False, "无法解析 SQL 语句"
+                return None, "无法解析 SQL 语句"
 
             # Check if it's a SELECT statement
             if not isinstance(statement, exp.Select):
-                return False, "只允许执行 SELECT 语句"
+                return None, "只允许执行 SELECT 语句"
 
-            return True, ""
+            return statement, ""
 
         except sqlglot.errors.ParseError as e:
-            return False, f"SQL 语法错误: {str(e)}"
+            return None, f"SQL 语法错误: {str(e)}"
         except Exception as e:
-            return False, f"SQL 验证失败: {str(e)}"
-
-    def inject_limit(self, sql: str, dialect: str = "postgres", limit: int | None = None) -> str:
-        """
-        Inject LIMIT clause if not present.
-        Returns the modified SQL.
-        """
-        if limit is None:
-            limit = self.settings.default_limit
+            return None, f"SQL 验证失败: {str(e)}"
 
+    def _limit_statement(
+        self, sql: str, statement: exp.Expression, dialect: str, limit: int
+    ) -> str:
+        """Add LIMIT to a parsed statement in place. Returns the SQL to execute."""
         try:
-            statements = sqlglot.parse(sql, dialect=dialect)
-            if not statements or statements[0] is None:
-                return sql
-
-            statement = statements[0]
-
-            # Check if LIMIT already exists
-            if statement.find(exp.Limit) is not None:
+            # Check if the outer query already has LIMIT (or FETCH FIRST); a LIMIT
+            # inside a subquery or CTE does not bound the result
+            if statement.args.get("limit") is not None:
                 return sql
 
             # Add LIMIT
-            statement = statement.limit(limit)
+            statement = statement.limit(limit, copy=False)
             return statement.sql(dialect=dialect)
 
         except Exception:
-            # If parsing fails, return original SQL
+            # If rewriting fails, return original SQL
             return sql
 
     async def execute_query(
@@ -84,116 +329,459 @@ class QueryService:
         request: QueryRequest,
     ) -> QueryResult:
         """Execute a SQL query against a database."""
-        # Get connection URL
-        storage = await get_storage()
-        url = await storage.get_connection_url(db_name)
-        if url is None:
-            raise ValueError(f"数据库连接 '{db_name}' 不存在")
+        result = await self.execute_query_raw(db_name, request)
+        return QueryResult(**result)
 
-        parsed = parse_db_url(url)
-        dialect = parsed["db_type"]
+    async def execute_query_raw(
+        self,
+        db_name: str,
+        request: QueryRequest,
+    ) -> dict[str, Any]:
+        """
+        Execute a SQL query and return the QueryResult fields as a plain dict,
+        for encoders that skip per-cell model validation.
+        At most settings.max_rows rows are fetched from the cursor, whatever LIMIT
+        the SQL carries; the result is flagged as truncated when more were available.
+        Results are served from the result cache when the connection has a TTL,
+        and identical queries that run concurrently share a single execution.
+        With request.page_size, one page is fetched and next_page_token is set
+        when there are more rows.
+        Raises TimeoutError if the statement runs past its timeout.
+        """
+        url, dialect = await self._resolve_connection(db_name)
 
-        # Validate SQL
-        is_valid, error = self.validate_sql(request.sql, dialect)
-        if not is_valid:
-            raise ValueError(error)
+        # Validate SQL and inject LIMIT (or the page's LIMIT/OFFSET) if needed
+        page_plan = None
+        if request.page_size is not None:
+            sql, page_plan, param_count = self._prepare_page(request, dialect)
+            normalized = sql
+        else:
+            sql, normalized, param_count = self._prepare_checked(request.sql, dialect)
+        params = self._bind_params(request, param_count)
+        if params:
+            normalized = f"{normalized}\x00{json.dumps(params)}"
 
-        # Inject LIMIT if needed
-        sql = self.inject_limit(request.sql, dialect)
+        result = await self._execute_shared(
+            db_name, url, dialect, sql, params, normalized, request
+        )
+        if page_plan is None:
+            return result
+
+        rows = result["rows"]
+        page_size = request.page_size
+        return {
+            **result,
+            "rows": rows[:page_size],
+            "row_count": min(len(rows), page_size),
+            "truncated": False,
+            "next_page_token": next_page_token(page_plan, result["columns"], rows),
+        }
 
-        # Execute query
+    def _prepare_page(
+        self, request: QueryRequest, dialect: str
+    ) -> tuple[str, dict[str, Any], int]:
+        """
+        Validate SQL and build the SQL for the requested page.
+        Returns (sql, page plan, param_count).
+        """
+        if request.page_size > self.settings.max_rows:
+            raise ValueError(f"每页行数不能超过 {self.settings.max_rows}")
+        statement, error = self._parse(request.sql, dialect)
+        if statement is None:
+            raise ValueError(error)
+        param_count = _param_count(statement, dialect)
+        page, plan = plan_page(statement, dialect, request.page_size, request.page_token)
+        return _render(page, dialect, param_count), plan, param_count
+
+    def _bind_params(self, request: QueryRequest, param_count: int) -> list[Param] | None:
+        """Check the request supplies as many parameters as the SQL has placeholders."""
+        params = request.params or []
+        if len(params) != param_count:
+            raise ValueError(f"SQL 需要 {param_count} 个参数，实际提供了 {len(params)} 个")
+        return params or None
+
+    async def _execute_shared(
+        self,
+        db_name: str,
+        url: str,
+        dialect: str,
+        sql: str,
+        params: list[Param] | None,
+        normalized: str,
+        request: QueryRequest,
+    ) -> dict[str, Any]:
+        """
+        Execute prepared SQL through the result cache and in-flight coalescing.
+        normalized identifies the query and its parameters in both.
+        """
+        cache = get_result_cache()
+        cache_ttl = await self._resolve_cache_ttl(db_name)
+        if cache_ttl > 0:
+            hit = cache.get(db_name, normalized)
+            if hit is not None:
+                cached, age = hit
+                return {**cached, "cached": True, "cache_age": round(age, 3)}
+        generation = cache.generation(db_name)
+
+        timeout = await self._resolve_timeout(db_name, request)
+
+        async def run() -> dict[str, Any]:
+            result = await self._execute(db_name, url, dialect, sql, params, timeout)
+            cache.set(db_name, normalized, result, cache_ttl, generation)
+            return result
+
+        # The timeout is part of the key so a caller never waits longer than it asked for
+        return await self._in_flight.do((db_name, normalized, timeout), run)
+
+    async def _execute(
+        self,
+        db_name: str,
+        url: str,
+        dialect: str,
+        sql: str,
+        params: list[Param] | None,
+        timeout: float,
+    ) -> dict[str, Any]:
+        """Run a prepared query and collect up to settings.max_rows rows."""
+        # Execute query, fetching one row past the cap to detect truncation
         start_time = time.time()
 
-        if dialect == "postgres":
-            result = await self._execute_postgres(url, sql)
-        else:
-            result = await self._execute_mysql(url, sql, parsed)
+        max_rows = self.settings.max_rows
+        # Time spent queued for a slot does not count against the statement timeout
+        async with get_scheduler().slot(db_name):
+            batches = self._stream_driver(
+                db_name, url, dialect, sql, params, max_rows + 1, max_rows + 1, timeout
+            )
+            try:
+                # Client-side backstop for the server-side statement timeout
+                async with asyncio.timeout(timeout + self.settings.query_timeout_grace):
+                    columns, rows = await anext(batches)
+            except TimeoutError:
+                raise TimeoutError(f"查询超时（{timeout:g} 秒）") from None
+            finally:
+                await batches.aclose()
+
+        truncated = len(rows) > max_rows
+        if truncated:
+            del rows[max_rows:]
 
         execution_time = (time.time() - start_time) * 1000  # Convert to milliseconds
 
-        return QueryResult(
-            columns=result["columns"],
-            rows=result["rows"],
-            row_count=len(result["rows"]),
-            execution_time=round(execution_time, 2),
-        )
+        return {
+            "columns": columns,
+            "rows": rows,
+            "row_count": len(rows),
+            "execution_time": round(execution_time, 2),
+            "truncated": truncated,
+        }
 
-    async def _execute_postgres(self, url: str, sql: str) -> dict[str, Any]:
-        """Execute query on PostgreSQL."""
-        conn = await asyncpg.connect(url)
-        try:
-            # Execute query
-            records = await conn.fetch(sql)
-
-            if not records:
-                return {"columns": [], "rows": []}
-
-            # Get column info from first record
-            columns = [
-                Column(name=key, type=self._get_type_name(records[0][key]))
-                for key in records[0].keys()
-            ]
-
-            # Convert records to rows
-            rows = [[self._serialize_value(record[col.name]) for col in columns] for record in records]
-
-            return {"columns": columns, "rows": rows}
-
-        finally:
-            await conn.close()
-
-    async def _execute_mysql(self, url: str, sql: str, parsed: dict) -> dict[str, Any]:
-        """Execute query on MySQL."""
-        conn = await aiomysql.connect(
-            host=parsed["host"],
-            port=parsed["port"],
-            user=parsed["user"],
-            password=parsed["password"],
-            db=parsed["database"],
+    async def stream_query(
+        self,
+        db_name: str,
+        request: QueryRequest,
+        limit: int | None = None,
+    ) -> AsyncIterator[tuple[list[Column], list[list]]]:
+        """
+        Validate a query and return an async iterator over its result batches.
+        Each item is (columns, rows); rows are fetched through a server-side cursor,
+        so only one batch is held in memory at a time, and fetching stops after
+        `limit` rows even if the SQL asks for more.
+        The first batch is fetched before returning, so validation and connection
+        errors are raised here rather than in the middle of a response.
+        """
+        limit = limit or self.settings.stream_limit
+        url, dialect = await self._resolve_connection(db_name)
+        timeout = self._stream_timeout(request)
+        sql, _, param_count = self._prepare_checked(request.sql, dialect, limit)
+        params = self._bind_params(request, param_count)
+
+        batches = self._stream(
+            db_name, url, dialect, sql, params, self.settings.stream_batch_size, limit, timeout
         )
         try:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
-                await cursor.execute(sql)
-                records = await cursor.fetchall()
+            first = await anext(batches)
+        except BaseException:
+            await batches.aclose()
+            raise
+        return self._chain_batches(first, batches)
 
-                if not records:
-                    return {"columns": [], "rows": []}
+    async def _chain_batches(
+        self,
+        first: tuple[list[Column], list[list]],
+        batches: AsyncIterator[tuple[list[Column], list[list]]],
+    ) -> AsyncIterator[tuple[list[Column], list[list]]]:
+        """Yield an already fetched batch followed by the rest of the stream."""
+        yield first
+        async for batch in batches:
+            yield batch
+
+    def _stream_timeout(self, request: QueryRequest) -> float:
+        """
+        Get the statement timeout in seconds for a streamed query, 0 for none.
+        A stream runs for as long as the client keeps reading, and on MySQL
+        max_execution_time covers reading the whole result, so streams use the
+        export timeout rather than the interactive one; a request may lower it.
+        """
+        timeout = self.settings.export_timeout
+        if request.timeout is not None:
+            timeout = min(timeout, request.timeout) if timeout else request.timeout
+        return timeout
 
-                # Get columns from first record
-                first_record = records[0]
-                columns = [
-                    Column(name=key, type=self._get_type_name(first_record[key]))
-                    for key in first_record.keys()
-                ]
+    async def _resolve_connection(self, db_name: str) -> tuple[str, str]:
+        """Get (url, dialect) for a connection name."""
+        storage = await get_storage()
+        url = await storage.get_connection_url(db_name)
+        if url is None:
+            raise ValueError(f"数据库连接 '{db_name}' 不存在")
 
-                # Convert records to rows
-                rows = [
-                    [self._serialize_value(record[col.name]) for col in columns]
-                    for record in records
-                ]
+        parsed = parse_db_url(url)
+        return url, parsed["db_type"]
 
-                return {"columns": columns, "rows": rows}
+    async def _resolve_timeout(self, db_name: str, request: QueryRequest) -> float:
+        """
+        Get the statement timeout in seconds for a query.
+        The connection's timeout (or the default) is the ceiling; a request may only lower it.
+        """
+        storage = await get_storage()
+        timeout = await storage.get_query_timeout(db_name) or self.settings.query_timeout
+        if request.timeout is not None:
+            timeout = min(timeout, request.timeout)
+        return timeout
 
-        finally:
-            conn.close()
+    async def _resolve_cache_ttl(self, db_name: str) -> float:
+        """Get the result cache TTL in seconds for a connection; 0 means no caching."""
+        storage = await get_storage()
+        ttl = await storage.get_result_cache_ttl(db_name)
+        return self.settings.result_cache_ttl if ttl is None else ttl
 
-    def _get_type_name(self, value: Any) -> str:
-        """Get type name for a value."""
-        if value is None:
-            return "null"
-        type_name = type(value).__name__
-        type_map = {
-            "int": "integer",
-            "float": "number",
-            "str": "string",
-            "bool": "boolean",
-            "datetime": "datetime",
-            "date": "date",
-            "time": "time",
-            "Decimal": "decimal",
-            "bytes": "binary",
-        }
-        return type_map.get(type_name, type_name)
+    async def _stream(
+        self,
+        db_name: str,
+        url: str,
+        dialect: str,
+        sql: str,
+        params: list[Param] | None,
+        batch_size: int,
+        max_rows: int,
+        timeout: float,
+    ) -> AsyncIterator[tuple[list[Column], list[list]]]:
+        """
+        Stream query results in batches from the right driver.
+        params are bound to the SQL's placeholders, if any.
+        A scheduler slot for the connection is held until the stream is closed.
+        Raises QueryRejectedError if the connection has too many queries queued.
+        """
+        async with get_scheduler().slot(db_name):
+            batches = self._stream_driver(
+                db_name, url, dialect, sql, params, batch_size, max_rows, timeout
+            )
+            async with aclosing(batches):
+                async for batch in batches:
+                    yield batch
+
+    def _stream_driver(
+        self,
+        db_name: str,
+        url: str,
+        dialect: str,
+        sql: str,
+        params: list[Param] | None,
+        batch_size: int,
+        max_rows: int,
+        timeout: float,
+    ) -> AsyncIterator[tuple[list[Column], list[list]]]:
+        """Stream query results in batches from the right driver, without a scheduler slot."""
+        if dialect == "postgres":
+            return self._stream_postgres(db_name, url, sql, params, batch_size, max_rows, timeout)
+        return self._stream_mysql(db_name, url, sql, params, batch_size, max_rows, timeout)
+
+    async def _stream_postgres(
+        self,
+        db_name: str,
+        url: str,
+        sql: str,
+        params: list[Param] | None,
+        batch_size: int,
+        max_rows: int,
+        timeout: float,
+    ) -> AsyncIterator[tuple[list[Column], list[list]]]:
+        """
+        Stream query results from PostgreSQL in batches.
+        Always yields at least one (possibly empty) batch and stops after max_rows rows.
+        Cancelling the consumer cancels the statement on the server, which asyncpg
+        does itself by sending a cancel request for the backend.
+        If the target's schema changed under a cached statement, the connection's
+        statement and type caches are cleared and the query is retried once.
+        """
+        async with get_pool_manager().acquire(db_name, url) as conn:
+            batches = self._postgres_batches(conn, sql, params, batch_size, max_rows, timeout)
+            try:
+                first = await anext(batches)
+            except _STALE_STATEMENT_ERRORS:
+                await conn.reload_schema_state()
+                batches = self._postgres_batches(
+                    conn, sql, params, batch_size, max_rows, timeout
+                )
+                first = await anext(batches)
+
+            async with aclosing(batches):
+                yield first
+                async for batch in batches:
+                    yield batch
+
+    async def _postgres_batches(
+        self,
+        conn: Any,
+        sql: str,
+        params: list[Param] | None,
+        batch_size: int,
+        max_rows: int,
+        timeout: float,
+    ) -> AsyncIterator[tuple[list[Column], list[list]]]:
+        """
+        Run a query on a PostgreSQL connection in a read-only transaction and
+        yield its result batches.
+        Statements come from the connection's statement cache, so a repeated
+        query is parsed and planned once per connection.
+        """
+        # Cursors need a transaction in PostgreSQL
+        async with conn.transaction(readonly=True):
+            await conn.execute(f"SET LOCAL statement_timeout = {int(timeout * 1000)}")
+            # The public prepare() always creates a new server-side statement;
+            # _prepare(use_cache=True) reuses the connection's LRU of statements
+            statement = await conn._prepare(sql, use_cache=True)
+            columns, serializers = self._postgres_columns(statement.get_attributes())
+            values = _postgres_params(params, statement.get_parameters())
+            cursor = await statement.cursor(*values)
+
+            has_rows = False
+            remaining = max_rows
+            while remaining > 0:
+                try:
+                    records = await cursor.fetch(min(batch_size, remaining))
+                except asyncpg.exceptions.QueryCanceledError:
+                    raise TimeoutError(f"查询超时（{timeout:g} 秒）") from None
+                if not records:
+                    break
+                has_rows = True
+                remaining -= len(records)
+                yield columns, self._serialize_rows(records, serializers)
+
+            if not has_rows:
+                yield columns, []
+
+    async def _stream_mysql(
+        self,
+        db_name: str,
+        url: str,
+        sql: str,
+        params: list[Param] | None,
+        batch_size: int,
+        max_rows: int,
+        timeout: float,
+    ) -> AsyncIterator[tuple[list[Column], list[list]]]:
+        """
+        Stream query results from MySQL in batches.
+        Always yields at least one (possibly empty) batch and stops after max_rows rows.
+        Cancelling the consumer runs KILL QUERY for the statement on the server.
+        Parameters are escaped and interpolated by aiomysql on the client.
+        """
+        async with get_pool_manager().acquire(db_name, url) as conn:
+            cursor = await conn.cursor(aiomysql.SSCursor)
+            # The statement was sent and its result is not fully read yet
+            running = False
+            try:
+                await cursor.execute(
+                    f"SET SESSION max_execution_time = {int(timeout * 1000)}"
+                )
+                running = True
+                await cursor.execute(sql, params)
+                columns, serializers = self._mysql_columns(cursor.description or ())
+
+                has_rows = False
+                remaining = max_rows
+                while remaining > 0:
+                    size = min(batch_size, remaining)
+                    records = await cursor.fetchmany(size)
+                    # A short batch means the server has sent the whole result
+                    if len(records) < size:
+                        running = False
+                    if not records:
+                        break
+                    has_rows = True
+                    remaining -= len(records)
+                    yield columns, self._serialize_rows(records, serializers)
+
+                if not has_rows:
+                    yield columns, []
+            except aiomysql.MySQLError as e:
+                # An error from the server ends the statement
+                running = False
+                if e.args and e.args[0] == _MYSQL_QUERY_TIMEOUT:
+                    raise TimeoutError(f"查询超时（{timeout:g} 秒）") from None
+                raise
+            except asyncio.CancelledError:
+                if running:
+                    await self._kill_mysql_query(url, conn)
+                raise
+            finally:
+                if running or conn.closed:
+                    # Closing an unbuffered cursor drains the remaining rows, and a
+                    # read cut off midway leaves the connection in an unknown state;
+                    # drop the connection instead so the pool discards it.
+                    conn.close()
+                else:
+                    await cursor.close()
+
+    async def _kill_mysql_query(self, url: str, conn: Any) -> None:
+        """Stop the statement still running for an abandoned MySQL query."""
+        try:
+            await get_pool_manager().kill_mysql_query(url, conn.thread_id())
+        except Exception as e:
+            logger.warning(f"Failed to kill MySQL query on thread {conn.thread_id()}: {e}")
+
+    def _postgres_columns(
+        self, attributes: Any
+    ) -> tuple[list[Column], list[Serializer]]:
+        """Build columns and per-column serializers from asyncpg statement attributes."""
+        columns = []
+        serializers = []
+        for attr in attributes:
+            if attr.type.kind == "scalar" and attr.type.name in _POSTGRES_TYPES:
+                type_name, serializer = _POSTGRES_TYPES[attr.type.name]
+            else:
+                # Arrays, enums, composites and extension types
+                type_name, serializer = attr.type.name, self._serialize_value
+            columns.append(Column(name=attr.name, type=type_name))
+            serializers.append(serializer)
+        return columns, serializers
+
+    def _mysql_columns(
+        self, description: Any
+    ) -> tuple[list[Column], list[Serializer]]:
+        """Build columns and per-column serializers from a MySQL cursor description."""
+        columns = []
+        serializers = []
+        for desc in description:
+            name, type_code = desc[0], desc[1]
+            type_name, serializer = _MYSQL_TYPES.get(
+                type_code, (_MYSQL_TYPE_NAMES.get(type_code, "unknown"), self._serialize_value)
+            )
+            columns.append(Column(name=name, type=type_name))
+            serializers.append(serializer)
+        return columns, serializers
+
+    def _serialize_rows(self, records: list[Any], serializers: list[Serializer]) -> list[list]:
+        """
+        Copy a batch into rows, then serialize in place only the columns that need it.
+        Cheaper than building per-column lists and transposing them back.
+        """
+        rows = [list(record) for record in records]
+        for i, serializer in enumerate(serializers):
+            if serializer is not None:
+                for row in rows:
+                    row[i] = serializer(row[i])
+        return rows
 
     def _serialize_value(self, value: Any) -> Any:
         """Serialize value for JSON response."""
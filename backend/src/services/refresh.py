@@ -0,0 +1,196 @@
+"""Background metadata refresh jobs."""
+
+import asyncio
+import logging
+import random
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from src.config import get_settings
+from src.models.database import RefreshJob
+from src.storage.sqlite import get_storage
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for status lookups
+_MAX_FINISHED_JOBS = 100
+
+
+class RefreshService:
+    """
+    Run metadata refreshes as background jobs.
+    At most one refresh runs per connection; starting another while one is
+    running returns the running job.
+    With start_periodic(), every registered connection is also refreshed on
+    settings.metadata_refresh_interval, with jitter and backoff after failures.
+    """
+
+    def __init__(self) -> None:
+        self.settings = get_settings()
+        self._jobs: OrderedDict[str, RefreshJob] = OrderedDict()
+        # connection name -> (job, task) of the running refresh
+        self._running: dict[str, tuple[RefreshJob, asyncio.Task]] = {}
+        # Bounds introspection connections across all refreshes
+        self._introspection = asyncio.Semaphore(self.settings.max_introspection_connections)
+        # Periodic refresh state: connection name -> monotonic due time / consecutive failures
+        self._due: dict[str, float] = {}
+        self._failures: dict[str, int] = {}
+        self._scheduled: set[str] = set()
+        self._periodic: asyncio.Task | None = None
+
+    def start(self, name: str, force: bool = False) -> RefreshJob:
+        """
+        Start a refresh for a connection, or return the one already running.
+        Unless force is set, the refresh is skipped if the schema is unchanged.
+        """
+        running = self._running.get(name)
+        if running is not None:
+            return running[0]
+
+        job = RefreshJob(
+            job_id=uuid.uuid4().hex,
+            connection_name=name,
+            started_at=datetime.now(),
+        )
+        self._jobs[job.job_id] = job
+        self._trim()
+        task = asyncio.create_task(self._run(job, force))
+        self._running[name] = (job, task)
+        return job
+
+    async def cancel(self, name: str) -> None:
+        """
+        Cancel the refresh running for a connection, if any, and wait for it to stop.
+        Used when the connection is repointed or deleted, so a refresh of the old
+        database cannot save its metadata afterwards.
+        """
+        running = self._running.get(name)
+        if running is None:
+            return
+        task = running[1]
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # Not a failure of the connection, so no backoff
+        self._failures.pop(name, None)
+
+    def get_job(self, job_id: str) -> RefreshJob | None:
+        """Get a job by ID."""
+        return self._jobs.get(job_id)
+
+    def start_periodic(self) -> None:
+        """Start refreshing all connections in the background, unless disabled."""
+        if self.settings.metadata_refresh_interval > 0 and self._periodic is None:
+            self._periodic = asyncio.create_task(self._run_periodic())
+
+    async def close(self) -> None:
+        """Stop periodic refreshes and cancel running jobs."""
+        if self._periodic is not None:
+            self._periodic.cancel()
+            await asyncio.gather(self._periodic, return_exceptions=True)
+            self._periodic = None
+        tasks = [task for _, task in self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, job: RefreshJob, force: bool) -> None:
+        """Refresh metadata and record the outcome on the job."""
+        from src.services.database import get_database_service
+
+        def on_tables(total: int) -> None:
+            job.tables_total = total
+
+        def on_progress(done: int) -> None:
+            job.tables_done = done
+
+        try:
+            async with self._introspection:
+                job.status = "running"
+                result = await get_database_service().refresh_metadata(
+                    job.connection_name, on_tables=on_tables, on_progress=on_progress, force=force
+                )
+            if result is None:
+                raise ValueError(f"数据库连接 '{job.connection_name}' 不存在")
+            # on_tables is only called when introspection ran
+            job.schema_changed = job.tables_total is not None
+            job.status = "succeeded"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "刷新已取消"
+            raise
+        except Exception as e:
+            logger.warning(f"Metadata refresh for '{job.connection_name}' failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            if self._running.get(job.connection_name, (None,))[0] is job:
+                del self._running[job.connection_name]
+            self._scheduled.discard(job.connection_name)
+            self._reschedule(job)
+
+    async def _run_periodic(self) -> None:
+        """Start refreshes for due connections every tick."""
+        while True:
+            try:
+                await self._start_due()
+            except Exception as e:
+                logger.warning(f"Periodic metadata refresh failed to run: {e}")
+            await asyncio.sleep(self.settings.metadata_refresh_tick)
+
+    async def _start_due(self) -> None:
+        """Start refreshes for connections that are due, up to the parallelism limit."""
+        storage = await get_storage()
+        names = {conn.name for conn in await storage.get_all_connections()}
+        interval = self.settings.metadata_refresh_interval
+        now = time.monotonic()
+
+        # Forget deleted connections; spread the first refresh of new ones over an interval
+        for name in set(self._due) - names:
+            self._due.pop(name, None)
+            self._failures.pop(name, None)
+        for name in names - set(self._due):
+            self._due[name] = now + random.uniform(0, interval)
+
+        slots = self.settings.metadata_refresh_parallelism - len(self._scheduled)
+        due = sorted(
+            (name for name in names if self._due[name] <= now and name not in self._running),
+            key=self._due.__getitem__,
+        )
+        for name in due[: max(0, slots)]:
+            self._scheduled.add(name)
+            self.start(name)
+
+    def _reschedule(self, job: RefreshJob) -> None:
+        """Set when a connection is next refreshed, backing off after failures."""
+        name = job.connection_name
+        interval = self.settings.metadata_refresh_interval
+        if job.status == "succeeded":
+            self._failures.pop(name, None)
+            jitter = self.settings.metadata_refresh_jitter
+            delay = interval * random.uniform(1 - jitter, 1 + jitter)
+        else:
+            failures = self._failures.get(name, 0) + 1
+            self._failures[name] = failures
+            delay = min(interval * 2 ** failures, self.settings.metadata_refresh_max_backoff)
+        self._due[name] = time.monotonic() + delay
+
+    def _trim(self) -> None:
+        """Drop the oldest finished jobs beyond the retention limit."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[: max(0, len(finished) - _MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+# Global service instance
+_refresh_service: RefreshService | None = None
+
+
+def get_refresh_service() -> RefreshService:
+    """Get refresh service instance."""
+    global _refresh_service
+    if _refresh_service is None:
+        _refresh_service = RefreshService()
+    return _refresh_service
@@ -0,0 +1,117 @@
+"""Query result cache."""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any
+
+from src.config import get_settings
+
+# Rows sampled to estimate the size of a result
+_SIZE_SAMPLE_ROWS = 100
+
+
+def estimate_result_size(rows: list[list]) -> int:
+    """Estimate the memory held by result rows from the JSON size of a sample."""
+    if not rows:
+        return 0
+    sample = rows[:_SIZE_SAMPLE_ROWS]
+    sample_bytes = len(json.dumps(sample, ensure_ascii=False, default=str))
+    return sample_bytes * len(rows) // len(sample)
+
+
+class ResultCache:
+    """
+    LRU cache of query results keyed by (connection name, normalized SQL).
+    Bounded by total estimated bytes; each entry expires after its connection's TTL.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        # key -> (created_at, expires_at, size, result)
+        self._entries: OrderedDict[tuple[str, str], tuple[float, float, int, dict]] = (
+            OrderedDict()
+        )
+        self._bytes = 0
+        # Bumped on invalidation so queries that started before it are not stored
+        self._generations: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, db_name: str, sql: str) -> tuple[dict[str, Any], float] | None:
+        """Get a cached result and its age in seconds, or None."""
+        key = (db_name, sql)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is None or entry[1] < now:
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[3], now - entry[0]
+
+    def generation(self, db_name: str) -> int:
+        """Get the invalidation generation of a connection, to pass back to set()."""
+        return self._generations.get(db_name, 0)
+
+    def set(
+        self, db_name: str, sql: str, result: dict[str, Any], ttl: float, generation: int
+    ) -> None:
+        """
+        Store a result, unless the connection was invalidated since `generation`.
+        Results larger than a quarter of the budget are not cached.
+        """
+        if ttl <= 0 or generation != self.generation(db_name):
+            return
+        size = estimate_result_size(result["rows"])
+        if size > self.max_bytes // 4:
+            return
+
+        key = (db_name, sql)
+        if key in self._entries:
+            self._remove(key)
+        now = time.monotonic()
+        self._entries[key] = (now, now + ttl, size, result)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate(self, db_name: str) -> None:
+        """Drop all cached results of a connection."""
+        self._generations[db_name] = self.generation(db_name) + 1
+        for key in [key for key in self._entries if key[0] == db_name]:
+            self._remove(key)
+
+    def stats(self) -> dict[str, int | float]:
+        """Get cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        """Remove an entry and release its bytes."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+
+
+# Global result cache instance
+_result_cache: ResultCache | None = None
+
+
+def get_result_cache() -> ResultCache:
+    """Get result cache instance."""
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache(get_settings().result_cache_max_bytes)
+    return _result_cache
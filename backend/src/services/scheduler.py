@@ -0,0 +1,119 @@
+"""Per-connection admission control for target database queries."""
+
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from src.config import get_settings
+
+
+class QueryRejectedError(Exception):
+    """Raised when a query cannot be admitted because its connection is saturated."""
+
+
+class _Lane:
+    """Running and waiting queries of one connection."""
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        # FIFO of waiters; a waiter's future is resolved when a slot is handed to it
+        self.waiters: deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+
+class QueryScheduler:
+    """
+    Limit concurrent queries per connection name.
+    At most settings.max_concurrent_queries run at once; further queries wait in a
+    bounded FIFO queue, so one busy connection cannot take over a target database and
+    queries are admitted in arrival order. When the queue is full, or a query waits
+    longer than settings.query_queue_timeout, QueryRejectedError is raised.
+    """
+
+    def __init__(self) -> None:
+        self.settings = get_settings()
+        self._lanes: dict[str, _Lane] = {}
+
+    @asynccontextmanager
+    async def slot(self, name: str) -> AsyncIterator[None]:
+        """Hold a query slot for a connection for the duration of the block."""
+        lane = self._lanes.setdefault(name, _Lane())
+        start = time.monotonic()
+
+        if lane.in_flight < self.settings.max_concurrent_queries and not lane.waiters:
+            lane.in_flight += 1
+        else:
+            await self._wait(name, lane)
+
+        wait = time.monotonic() - start
+        lane.admitted += 1
+        lane.wait_total += wait
+        lane.wait_max = max(lane.wait_max, wait)
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    def stats(self) -> dict[str, dict[str, int | float]]:
+        """Get queue counters per connection name."""
+        return {
+            name: {
+                "in_flight": lane.in_flight,
+                "queued": len(lane.waiters),
+                "admitted": lane.admitted,
+                "rejected": lane.rejected,
+                "avg_wait_ms": (
+                    round(lane.wait_total / lane.admitted * 1000, 2) if lane.admitted else 0.0
+                ),
+                "max_wait_ms": round(lane.wait_max * 1000, 2),
+            }
+            for name, lane in self._lanes.items()
+        }
+
+    async def _wait(self, name: str, lane: _Lane) -> None:
+        """Queue for a slot; on return the slot has been handed over to the caller."""
+        if len(lane.waiters) >= self.settings.query_queue_size:
+            lane.rejected += 1
+            raise QueryRejectedError(f"数据库 '{name}' 的查询排队已满，请稍后重试")
+
+        waiter = asyncio.get_running_loop().create_future()
+        lane.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.settings.query_queue_timeout)
+        except BaseException as e:
+            if waiter.done():
+                # The slot was handed over just as we gave up, pass it on
+                self._release(lane)
+            else:
+                waiter.cancel()
+                lane.waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                lane.rejected += 1
+                raise QueryRejectedError(f"数据库 '{name}' 的查询排队超时，请稍后重试") from None
+            raise
+
+    def _release(self, lane: _Lane) -> None:
+        """Hand a finished query's slot to the next waiter, or free it."""
+        while lane.waiters:
+            waiter = lane.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        lane.in_flight -= 1
+
+
+# Global scheduler instance
+_scheduler: QueryScheduler | None = None
+
+
+def get_scheduler() -> QueryScheduler:
+    """Get query scheduler instance."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = QueryScheduler()
+    return _scheduler
@@ -0,0 +1,123 @@
+"""Relevance index over table metadata for building LLM prompts."""
+
+import math
+import re
+from collections import Counter
+
+from src.models.database import TableMetadata
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+# Table name terms count more than field terms when scoring
+_TABLE_NAME_WEIGHT = 3
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9]*|\d+")
+_CJK_RE = re.compile(r"[一-鿿]+")
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def _stem(word: str) -> str:
+    """Reduce simple English plurals so 'orders' matches 'order'."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Split text into index terms.
+    Identifiers are split on underscores and camelCase and also kept whole;
+    Chinese text becomes single characters and character bigrams.
+    """
+    terms: list[str] = []
+    for identifier in re.split(r"[^A-Za-z0-9一-鿿]+", text):
+        if not identifier:
+            continue
+        words = [_stem(w.lower()) for w in _WORD_RE.findall(_CAMEL_RE.sub(" ", identifier))]
+        terms.extend(words)
+        if len(words) > 1:
+            terms.append("_".join(words))
+        for run in _CJK_RE.findall(identifier):
+            terms.extend(run)
+            terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+class SchemaIndex:
+    """
+    BM25 index with one document per table, built from the table name, field names
+    and their chinese_name annotations.
+    Tables are linked to the tables they likely reference by naming convention
+    (`customer_id` references `customer`/`customers`), since foreign key
+    constraints are not part of the stored metadata.
+    """
+
+    def __init__(self, tables: list[TableMetadata]) -> None:
+        self.tables = tables
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._lengths: list[int] = []
+
+        for doc, table in enumerate(tables):
+            terms = tokenize(table.table_name) * _TABLE_NAME_WEIGHT
+            if table.chinese_name:
+                terms += tokenize(table.chinese_name) * _TABLE_NAME_WEIGHT
+            for field in table.fields:
+                terms += tokenize(field.field_name)
+                if field.chinese_name:
+                    terms += tokenize(field.chinese_name)
+            self._lengths.append(len(terms))
+            for term, freq in Counter(terms).items():
+                self._postings.setdefault(term, []).append((doc, freq))
+
+        self._avg_length = sum(self._lengths) / len(tables) if tables else 0.0
+        self._references = self._link_references()
+
+    def rank(self, query: str, top_k: int) -> list[int]:
+        """
+        Get the positions of the top_k tables most relevant to a query, plus the
+        tables they reference, in their original order.
+        Returns an empty list if no table matches the query.
+        """
+        scores: dict[int, float] = {}
+        total = len(self.tables)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc, freq in postings:
+                norm = _K1 * (1 - _B + _B * self._lengths[doc] / self._avg_length)
+                scores[doc] = scores.get(doc, 0.0) + idf * freq * (_K1 + 1) / (freq + norm)
+
+        best = sorted(scores, key=lambda doc: (-scores[doc], doc))[:top_k]
+        selected = set(best)
+        for doc in best:
+            selected.update(self._references.get(doc, ()))
+        return sorted(selected)
+
+    def _link_references(self) -> dict[int, set[int]]:
+        """
+        Map each table to the tables its `<table>_id` fields point to.
+        Only outgoing links are followed, so a widely referenced table does not
+        pull all of its referrers into the prompt.
+        """
+        by_name: dict[str, int] = {}
+        for doc, table in enumerate(self.tables):
+            name = table.table_name.lower()
+            by_name.setdefault(name, doc)
+            by_name.setdefault(_stem(name), doc)
+
+        references: dict[int, set[int]] = {}
+        for doc, table in enumerate(self.tables):
+            for field in table.fields:
+                name = field.field_name.lower()
+                if not name.endswith("_id") or len(name) <= 3:
+                    continue
+                target = by_name.get(name[:-3], by_name.get(_stem(name[:-3])))
+                if target is not None and target != doc:
+                    references.setdefault(doc, set()).add(target)
+        return references
@@ -1,9 +1,15 @@
 """SQLite database storage operations."""
 
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from collections.abc import AsyncIterator, Callable
 import aiosqlite
 from pathlib import Path
 from datetime import datetime
 from src.config import get_settings
+from src.storage.cache import TTLCache
 from src.models.database import (
     DatabaseConnection,
     DatabaseConnectionDetail,
@@ -18,6 +24,9 @@ CREATE TABLE IF NOT EXISTS connections (
     name TEXT UNIQUE NOT NULL,
     url TEXT NOT NULL,
     db_type TEXT NOT NULL CHECK (db_type IN ('postgres', 'mysql')),
+    query_timeout REAL,
+    result_cache_ttl REAL,
+    schema_signature TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
@@ -29,6 +38,7 @@ CREATE TABLE IF NOT EXISTS table_metadata (
     table_name TEXT NOT NULL,
     table_type TEXT NOT NULL CHECK (table_type IN ('TABLE', 'VIEW')),
     chinese_name TEXT,
+    fingerprint TEXT,
     FOREIGN KEY (connection_id) REFERENCES connections(id) ON DELETE CASCADE,
     UNIQUE (connection_id, table_name)
 );
@@ -43,6 +53,7 @@ CREATE TABLE IF NOT EXISTS field_metadata (
     column_default TEXT,
     max_length INTEGER,
     chinese_name TEXT,
+    position INTEGER,
     FOREIGN KEY (table_id) REFERENCES table_metadata(id) ON DELETE CASCADE
 );
 
@@ -51,6 +62,31 @@ CREATE INDEX IF NOT EXISTS idx_table_metadata_connection ON table_metadata(conne
 CREATE INDEX IF NOT EXISTS idx_field_metadata_table ON field_metadata(table_id);
 """
 
+# Columns added to existing databases at initialize(): (table, column, definition)
+MIGRATIONS = (
+    ("connections", "query_timeout", "REAL"),
+    ("connections", "result_cache_ttl", "REAL"),
+    ("connections", "schema_signature", "TEXT"),
+    ("table_metadata", "fingerprint", "TEXT"),
+    ("field_metadata", "position", "INTEGER"),
+)
+
+# Per-connection pragmas; journal_mode=WAL is persistent and set once at initialize()
+PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+)
+
+# Tables handled per batch of statements when saving metadata; progress is
+# reported after each batch
+SAVE_BATCH_TABLES = 500
+
+INSERT_FIELD_SQL = """INSERT INTO field_metadata
+    (table_id, field_name, data_type, is_nullable, column_default, max_length, position)
+    VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
 
 class SQLiteStorage:
     """SQLite storage for connections and metadata."""
@@ -58,26 +94,80 @@ class SQLiteStorage:
     def __init__(self, db_path: Path | None = None) -> None:
         """Initialize storage with database path."""
         self.db_path = db_path or get_settings().sqlite_db_path
+        # Long-lived connections: reads share one, writes are serialized on the other.
+        # WAL lets the reader see the last committed state while a write is in progress.
+        self._reader: aiosqlite.Connection | None = None
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+        settings = get_settings()
+        self.cache = TTLCache(settings.storage_cache_max_entries, settings.storage_cache_ttl)
+        # Bumped whenever a connection's metadata may have changed
+        self._schema_versions: dict[str, int] = {}
 
     async def initialize(self) -> None:
-        """Initialize database schema."""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.executescript(SCHEMA)
-            await db.commit()
-
-    async def _get_connection(self) -> aiosqlite.Connection:
-        """Get database connection."""
-        db = await aiosqlite.connect(self.db_path)
+        """Open the shared connections and initialize database schema."""
+        self._writer = await self._open()
+        await self._writer.execute("PRAGMA journal_mode = WAL")
+        await self._writer.executescript(SCHEMA)
+        await self._migrate(self._writer)
+        await self._writer.commit()
+        self._reader = await self._open()
+
+    async def _migrate(self, db: aiosqlite.Connection) -> None:
+        """Add columns that are missing from databases created by older versions."""
+        for table, column, definition in MIGRATIONS:
+            cursor = await db.execute(f"PRAGMA table_info({table})")
+            if column not in {row["name"] for row in await cursor.fetchall()}:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+    async def close(self) -> None:
+        """Close the shared connections."""
+        async with self._write_lock:
+            for db in (self._reader, self._writer):
+                if db is not None:
+                    await db.close()
+            self._reader = None
+            self._writer = None
+
+    async def _open(self) -> aiosqlite.Connection:
+        """Open a connection with row factory and per-connection pragmas."""
+        db = await aiosqlite.connect(
+            self.db_path, cached_statements=get_settings().sqlite_statement_cache_size
+        )
         db.row_factory = aiosqlite.Row
+        for pragma in PRAGMAS:
+            await db.execute(pragma)
         return db
 
+    @asynccontextmanager
+    async def _read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Use the shared read connection."""
+        if self._reader is None:
+            raise RuntimeError("SQLiteStorage is not initialized")
+        yield self._reader
+
+    @asynccontextmanager
+    async def _write(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Run a write transaction on the shared write connection, one at a time."""
+        async with self._write_lock:
+            if self._writer is None:
+                raise RuntimeError("SQLiteStorage is not initialized")
+            db = self._writer
+            await db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                await db.rollback()
+                raise
+            await db.commit()
+
     # Connection operations
     async def get_all_connections(self) -> list[DatabaseConnection]:
         """Get all database connections."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._read() as db:
             cursor = await db.execute(
-                "SELECT id, name, db_type, created_at, updated_at FROM connections ORDER BY name"
+                """SELECT id, name, db_type, query_timeout, result_cache_ttl, created_at, updated_at
+                   FROM connections ORDER BY name"""
             )
             rows = await cursor.fetchall()
             return [
@@ -85,6 +175,8 @@ class SQLiteStorage:
                     id=row["id"],
                     name=row["name"],
                     db_type=row["db_type"],
+                    query_timeout=row["query_timeout"],
+                    result_cache_ttl=row["result_cache_ttl"],
                     created_at=datetime.fromisoformat(row["created_at"]),
                     updated_at=datetime.fromisoformat(row["updated_at"]),
                 )
@@ -93,10 +185,11 @@ class SQLiteStorage:
 
     async def get_connection_by_name(self, name: str) -> DatabaseConnection | None:
         """Get a database connection by name."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._read() as db:
             cursor = await db.execute(
-                "SELECT id, name, url, db_type, created_at, updated_at FROM connections WHERE name = ?",
+                """SELECT id, name, url, db_type, query_timeout, result_cache_ttl,
+                          created_at, updated_at
+                   FROM connections WHERE name = ?""",
                 (name,),
             )
             row = await cursor.fetchone()
@@ -106,72 +199,142 @@ class SQLiteStorage:
                 id=row["id"],
                 name=row["name"],
                 db_type=row["db_type"],
+                query_timeout=row["query_timeout"],
+                result_cache_ttl=row["result_cache_ttl"],
                 created_at=datetime.fromisoformat(row["created_at"]),
                 updated_at=datetime.fromisoformat(row["updated_at"]),
             )
 
     async def get_connection_url(self, name: str) -> str | None:
         """Get the connection URL for a database."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        target = await self._get_target(name)
+        return target["url"] if target else None
+
+    async def get_query_timeout(self, name: str) -> float | None:
+        """Get the statement timeout configured for a database, in seconds."""
+        target = await self._get_target(name)
+        return target["query_timeout"] if target else None
+
+    async def get_result_cache_ttl(self, name: str) -> float | None:
+        """Get the result cache TTL configured for a database, in seconds."""
+        target = await self._get_target(name)
+        return target["result_cache_ttl"] if target else None
+
+    async def get_schema_signature(self, name: str) -> str | None:
+        """Get the schema signature recorded at the last metadata refresh."""
+        async with self._read() as db:
             cursor = await db.execute(
-                "SELECT url FROM connections WHERE name = ?", (name,)
+                "SELECT schema_signature FROM connections WHERE name = ?", (name,)
             )
             row = await cursor.fetchone()
-            return row["url"] if row else None
+        return row["schema_signature"] if row else None
+
+    async def set_schema_signature(self, name: str, signature: str) -> None:
+        """Record the schema signature the saved metadata corresponds to."""
+        async with self._write() as db:
+            await db.execute(
+                "UPDATE connections SET schema_signature = ? WHERE name = ?", (signature, name)
+            )
+
+    async def _get_target(self, name: str) -> dict | None:
+        """Get the settings needed to run queries against a database."""
+        key = ("target", name)
+        target = self.cache.get(key)
+        if target is not None:
+            return target
+
+        version = self.cache.version(key)
+        async with self._read() as db:
+            cursor = await db.execute(
+                "SELECT url, query_timeout, result_cache_ttl FROM connections WHERE name = ?",
+                (name,),
+            )
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        target = {
+            "url": row["url"],
+            "query_timeout": row["query_timeout"],
+            "result_cache_ttl": row["result_cache_ttl"],
+        }
+        self.cache.set(key, target, version)
+        return target
 
     async def add_connection(
-        self, name: str, url: str, db_type: str
+        self,
+        name: str,
+        url: str,
+        db_type: str,
+        query_timeout: float | None = None,
+        result_cache_ttl: float | None = None,
     ) -> DatabaseConnection:
         """Add or update a database connection."""
         now = datetime.now().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._write() as db:
             # Try to update existing
             cursor = await db.execute(
-                "UPDATE connections SET url = ?, db_type = ?, updated_at = ? WHERE name = ?",
-                (url, db_type, now, name),
+                """UPDATE connections
+                   SET url = ?, db_type = ?, query_timeout = ?, result_cache_ttl = ?,
+                       updated_at = ?,
+                       schema_signature = CASE WHEN url = ? THEN schema_signature END
+                   WHERE name = ?""",
+                (url, db_type, query_timeout, result_cache_ttl, now, url, name),
             )
             if cursor.rowcount == 0:
                 # Insert new
                 cursor = await db.execute(
-                    "INSERT INTO connections (name, url, db_type, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
-                    (name, url, db_type, now, now),
+                    """INSERT INTO connections
+                       (name, url, db_type, query_timeout, result_cache_ttl, created_at, updated_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (name, url, db_type, query_timeout, result_cache_ttl, now, now),
                 )
-            await db.commit()
 
             # Get the connection
             cursor = await db.execute(
-                "SELECT id, name, db_type, created_at, updated_at FROM connections WHERE name = ?",
+                """SELECT id, name, db_type, query_timeout, result_cache_ttl, created_at, updated_at
+                   FROM connections WHERE name = ?""",
                 (name,),
             )
             row = await cursor.fetchone()
-            return DatabaseConnection(
-                id=row["id"],
-                name=row["name"],
-                db_type=row["db_type"],
-                created_at=datetime.fromisoformat(row["created_at"]),
-                updated_at=datetime.fromisoformat(row["updated_at"]),
-            )
+
+        self._invalidate(name)
+        return DatabaseConnection(
+            id=row["id"],
+            name=row["name"],
+            db_type=row["db_type"],
+            query_timeout=row["query_timeout"],
+            result_cache_ttl=row["result_cache_ttl"],
+            created_at=datetime.fromisoformat(row["created_at"]),
+            updated_at=datetime.fromisoformat(row["updated_at"]),
+        )
 
     async def delete_connection(self, name: str) -> bool:
         """Delete a database connection."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._write() as db:
             cursor = await db.execute(
                 "DELETE FROM connections WHERE name = ?", (name,)
             )
-            await db.commit()
-            return cursor.rowcount > 0
+        self._invalidate(name)
+        return cursor.rowcount > 0
 
     # Metadata operations
     async def save_metadata(
         self,
         connection_name: str,
         tables: list[dict],
-    ) -> None:
-        """Save metadata for a connection."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        on_progress: Callable[[int], None] | None = None,
+    ) -> bool:
+        """
+        Save metadata for a connection in a single transaction.
+        Only tables whose fingerprint changed are rewritten, field by field, so
+        chinese_name annotations survive; tables that are gone are deleted.
+        Tables are written in batches of SAVE_BATCH_TABLES with a few statements
+        each, and on_progress receives the number of tables handled after each batch.
+        Readers keep seeing the previous metadata until the transaction commits.
+        Returns whether anything changed.
+        """
+        changed = False
+        async with self._write() as db:
             # Get connection ID
             cursor = await db.execute(
                 "SELECT id FROM connections WHERE name = ?", (connection_name,)
@@ -181,108 +344,241 @@ class SQLiteStorage:
                 raise ValueError(f"Connection {connection_name} not found")
             connection_id = row["id"]
 
-            # Delete existing metadata
-            await db.execute(
-                "DELETE FROM table_metadata WHERE connection_id = ?", (connection_id,)
+            cursor = await db.execute(
+                "SELECT id, table_name, fingerprint FROM table_metadata WHERE connection_id = ?",
+                (connection_id,),
             )
-
-            # Insert new metadata
-            for table in tables:
-                cursor = await db.execute(
-                    "INSERT INTO table_metadata (connection_id, table_name, table_type) VALUES (?, ?, ?)",
-                    (connection_id, table["table_name"], table["table_type"]),
+            existing = {
+                r["table_name"]: (r["id"], r["fingerprint"]) for r in await cursor.fetchall()
+            }
+
+            for start in range(0, len(tables), SAVE_BATCH_TABLES):
+                batch = tables[start : start + SAVE_BATCH_TABLES]
+                if await self._save_tables(db, connection_id, batch, existing):
+                    changed = True
+                if on_progress is not None:
+                    on_progress(start + len(batch))
+
+            # Delete tables that no longer exist (fields cascade)
+            if existing:
+                await db.executemany(
+                    "DELETE FROM table_metadata WHERE id = ?",
+                    [(table_id,) for table_id, _ in existing.values()],
                 )
-                table_id = cursor.lastrowid
-
-                for field in table.get("fields", []):
-                    await db.execute(
-                        """INSERT INTO field_metadata
-                           (table_id, field_name, data_type, is_nullable, column_default, max_length)
-                           VALUES (?, ?, ?, ?, ?, ?)""",
-                        (
-                            table_id,
-                            field["field_name"],
-                            field["data_type"],
-                            field.get("is_nullable", True),
-                            field.get("column_default"),
-                            field.get("max_length"),
-                        ),
-                    )
+                changed = True
 
-            await db.commit()
+        if changed:
+            self._invalidate_metadata(connection_name)
+        return changed
+
+    async def _save_tables(
+        self,
+        db: aiosqlite.Connection,
+        connection_id: int,
+        tables: list[dict],
+        existing: dict[str, tuple[int, str | None]],
+    ) -> bool:
+        """
+        Insert new and rewrite changed tables of one batch.
+        Tables found in existing are removed from it. Returns whether anything changed.
+        """
+        added, modified = [], []
+        for table in tables:
+            fingerprint = _table_fingerprint(table)
+            current = existing.pop(table["table_name"], None)
+            if current is None:
+                added.append((table, fingerprint))
+            elif current[1] != fingerprint:
+                modified.append((current[0], table, fingerprint))
+
+        if added:
+            # Insert tables, then map names back to their new IDs
+            await db.executemany(
+                """INSERT INTO table_metadata (connection_id, table_name, table_type, fingerprint)
+                   VALUES (?, ?, ?, ?)""",
+                [
+                    (connection_id, table["table_name"], table["table_type"], fingerprint)
+                    for table, fingerprint in added
+                ],
+            )
+            names = [table["table_name"] for table, _ in added]
+            cursor = await db.execute(
+                f"""SELECT id, table_name FROM table_metadata
+                    WHERE connection_id = ? AND table_name IN ({", ".join("?" * len(names))})""",
+                (connection_id, *names),
+            )
+            table_ids = {r["table_name"]: r["id"] for r in await cursor.fetchall()}
+
+            # New tables have no fields yet, so they are inserted without a lookup
+            await db.executemany(
+                INSERT_FIELD_SQL,
+                [
+                    (table_ids[table["table_name"]], field["field_name"], *_field_values(field, i))
+                    for table, _ in added
+                    for i, field in enumerate(table.get("fields", []))
+                ],
+            )
+
+        if modified:
+            await db.executemany(
+                "UPDATE table_metadata SET table_type = ?, fingerprint = ? WHERE id = ?",
+                [
+                    (table["table_type"], fingerprint, table_id)
+                    for table_id, table, fingerprint in modified
+                ],
+            )
+            await self._save_fields(
+                db, [(table_id, table.get("fields", [])) for table_id, table, _ in modified]
+            )
+
+        return bool(added or modified)
+
+    async def _save_fields(
+        self, db: aiosqlite.Connection, tables: list[tuple[int, list[dict]]]
+    ) -> None:
+        """
+        Upsert the fields of existing tables by name, keeping chinese_name, and
+        delete missing ones. tables holds (table_id, fields) pairs.
+        """
+        table_ids = [table_id for table_id, _ in tables]
+        cursor = await db.execute(
+            f"""SELECT id, table_id, field_name, data_type, is_nullable, column_default,
+                       max_length, position
+                FROM field_metadata WHERE table_id IN ({", ".join("?" * len(table_ids))})""",
+            table_ids,
+        )
+        existing = {
+            (r["table_id"], r["field_name"]): (
+                r["id"],
+                (
+                    r["data_type"],
+                    bool(r["is_nullable"]),
+                    r["column_default"],
+                    r["max_length"],
+                    r["position"],
+                ),
+            )
+            for r in await cursor.fetchall()
+        }
+
+        inserts, updates = [], []
+        for table_id, fields in tables:
+            for position, field in enumerate(fields):
+                values = _field_values(field, position)
+                current = existing.pop((table_id, field["field_name"]), None)
+                if current is None:
+                    inserts.append((table_id, field["field_name"], *values))
+                elif current[1] != values:
+                    updates.append((*values, current[0]))
+
+        if inserts:
+            await db.executemany(INSERT_FIELD_SQL, inserts)
+        if updates:
+            await db.executemany(
+                """UPDATE field_metadata
+                   SET data_type = ?, is_nullable = ?, column_default = ?, max_length = ?,
+                       position = ?
+                   WHERE id = ?""",
+                updates,
+            )
+        if existing:
+            await db.executemany(
+                "DELETE FROM field_metadata WHERE id = ?",
+                [(field_id,) for field_id, _ in existing.values()],
+            )
 
     async def get_connection_with_metadata(
         self, name: str
     ) -> DatabaseConnectionDetail | None:
         """Get a connection with its metadata."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-
+        key = ("detail", name)
+        detail = self.cache.get(key)
+        if detail is not None:
+            return detail
+
+        version = self.cache.version(key)
+        detail = await self._load_connection_with_metadata(name)
+        if detail is not None:
+            self.cache.set(key, detail, version)
+        return detail
+
+    async def _load_connection_with_metadata(
+        self, name: str
+    ) -> DatabaseConnectionDetail | None:
+        """Load a connection with its metadata from the database."""
+        async with self._read() as db:
             # Get connection
             cursor = await db.execute(
-                "SELECT id, name, db_type, created_at, updated_at FROM connections WHERE name = ?",
+                """SELECT id, name, db_type, query_timeout, result_cache_ttl, created_at, updated_at
+                   FROM connections WHERE name = ?""",
                 (name,),
             )
             conn_row = await cursor.fetchone()
             if conn_row is None:
                 return None
 
-            # Get tables
+            # Get tables and their fields in one pass
             cursor = await db.execute(
-                """SELECT id, table_name, table_type, chinese_name
-                   FROM table_metadata WHERE connection_id = ? ORDER BY table_name""",
+                """SELECT tm.id AS table_id, tm.table_name, tm.table_type,
+                          tm.chinese_name AS table_chinese_name,
+                          fm.id, fm.field_name, fm.data_type, fm.is_nullable,
+                          fm.column_default, fm.max_length, fm.chinese_name
+                   FROM table_metadata tm
+                   LEFT JOIN field_metadata fm ON fm.table_id = tm.id
+                   WHERE tm.connection_id = ?
+                   ORDER BY tm.table_name, fm.position, fm.id""",
                 (conn_row["id"],),
             )
-            table_rows = await cursor.fetchall()
+            rows = await cursor.fetchall()
 
-            tables = []
-            for table_row in table_rows:
-                # Get fields for this table
-                cursor = await db.execute(
-                    """SELECT id, field_name, data_type, is_nullable, column_default, max_length, chinese_name
-                       FROM field_metadata WHERE table_id = ? ORDER BY id""",
-                    (table_row["id"],),
-                )
-                field_rows = await cursor.fetchall()
-
-                fields = [
-                    FieldMetadata(
-                        id=f["id"],
-                        field_name=f["field_name"],
-                        data_type=f["data_type"],
-                        is_nullable=bool(f["is_nullable"]),
-                        column_default=f["column_default"],
-                        max_length=f["max_length"],
-                        chinese_name=f["chinese_name"],
+            tables: list[TableMetadata] = []
+            current: TableMetadata | None = None
+            for r in rows:
+                if current is None or current.id != r["table_id"]:
+                    current = TableMetadata(
+                        id=r["table_id"],
+                        table_name=r["table_name"],
+                        table_type=r["table_type"],
+                        chinese_name=r["table_chinese_name"],
+                        fields=[],
                     )
-                    for f in field_rows
-                ]
-
-                tables.append(
-                    TableMetadata(
-                        id=table_row["id"],
-                        table_name=table_row["table_name"],
-                        table_type=table_row["table_type"],
-                        chinese_name=table_row["chinese_name"],
-                        fields=fields,
-                    )
-                )
+                    tables.append(current)
+                if r["id"] is not None:
+                    current.fields.append(_row_to_field(r))
 
             return DatabaseConnectionDetail(
                 id=conn_row["id"],
                 name=conn_row["name"],
                 db_type=conn_row["db_type"],
+                query_timeout=conn_row["query_timeout"],
+                result_cache_ttl=conn_row["result_cache_ttl"],
                 created_at=datetime.fromisoformat(conn_row["created_at"]),
                 updated_at=datetime.fromisoformat(conn_row["updated_at"]),
                 tables=tables,
             )
 
+    async def get_field_metadata(
+        self, connection_name: str, table_name: str, field_name: str
+    ) -> FieldMetadata | None:
+        """Get a single field's metadata."""
+        async with self._read() as db:
+            cursor = await db.execute(
+                """SELECT fm.id, fm.field_name, fm.data_type, fm.is_nullable,
+                          fm.column_default, fm.max_length, fm.chinese_name
+                   FROM field_metadata fm
+                   JOIN table_metadata tm ON fm.table_id = tm.id
+                   JOIN connections c ON tm.connection_id = c.id
+                   WHERE c.name = ? AND tm.table_name = ? AND fm.field_name = ?""",
+                (connection_name, table_name, field_name),
+            )
+            row = await cursor.fetchone()
+            return _row_to_field(row) if row else None
+
     async def update_field_chinese_name(
         self, connection_name: str, table_name: str, field_name: str, chinese_name: str
     ) -> bool:
         """Update the chinese name for a field."""
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
+        async with self._write() as db:
             # Get connection and table IDs
             cursor = await db.execute(
                 """SELECT fm.id FROM field_metadata fm
@@ -299,18 +595,90 @@ class SQLiteStorage:
                 "UPDATE field_metadata SET chinese_name = ? WHERE id = ?",
                 (chinese_name, row["id"]),
             )
-            await db.commit()
-            return True
+        self._invalidate_metadata(connection_name)
+        return True
+
+    def schema_version(self, name: str) -> int:
+        """
+        Get the in-process version of a connection's metadata, without I/O.
+        It changes whenever the metadata is saved with changes, annotated, or the
+        connection is replaced or deleted, so derived data can be cached under it.
+        """
+        return self._schema_versions.get(name, 0)
+
+    def _invalidate(self, name: str) -> None:
+        """Drop all cached entries for a connection."""
+        self.cache.invalidate(("target", name))
+        self._invalidate_metadata(name)
+
+    def _invalidate_metadata(self, name: str) -> None:
+        """Drop cached metadata of a connection and bump its schema version."""
+        self.cache.invalidate(("detail", name))
+        self._schema_versions[name] = self.schema_version(name) + 1
+
+
+def _field_values(field: dict, position: int) -> tuple:
+    """Stored column values of a field, as compared to decide whether it changed."""
+    return (
+        field["data_type"],
+        field.get("is_nullable", True),
+        field.get("column_default"),
+        field.get("max_length"),
+        position,
+    )
+
+
+def _table_fingerprint(table: dict) -> str:
+    """Hash of a table's type and column definitions, in column order."""
+    columns = [
+        (
+            field["field_name"],
+            field["data_type"],
+            field.get("is_nullable", True),
+            field.get("column_default"),
+            field.get("max_length"),
+        )
+        for field in table.get("fields", [])
+    ]
+    payload = json.dumps([table["table_type"], columns], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _row_to_field(row: aiosqlite.Row) -> FieldMetadata:
+    """Build a FieldMetadata from a field_metadata row."""
+    return FieldMetadata(
+        id=row["id"],
+        field_name=row["field_name"],
+        data_type=row["data_type"],
+        is_nullable=bool(row["is_nullable"]),
+        column_default=row["column_default"],
+        max_length=row["max_length"],
+        chinese_name=row["chinese_name"],
+    )
 
 
 # Global storage instance
 _storage: SQLiteStorage | None = None
 
 
+_storage_lock = asyncio.Lock()
+
+
 async def get_storage() -> SQLiteStorage:
     """Get or create storage instance."""
     global _storage
     if _storage is None:
-        _storage = SQLiteStorage()
-        await _storage.initialize()
+        async with _storage_lock:
+            if _storage is None:
+                storage = SQLiteStorage()
+                await storage.initialize()
+                _storage = storage
     return _storage
+
+
+async def close_storage() -> None:
+    """Close the storage instance, if open."""
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
@@ -0,0 +1,89 @@
+"""Tests for paged queries against SQLite."""
+
+import sqlite3
+
+import pytest
+import sqlglot
+
+from src.models.query import Column
+from src.services.pagination import next_page_token, plan_page
+
+DIALECT = "sqlite"
+
+
+@pytest.fixture
+def db() -> sqlite3.Connection:
+    """Two joined tables whose `id` columns sort in opposite orders."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE a (id INTEGER PRIMARY KEY, v TEXT)")
+    conn.execute("CREATE TABLE b (id INTEGER PRIMARY KEY, a_id INTEGER UNIQUE, w TEXT)")
+    conn.executemany("INSERT INTO a VALUES (?, ?)", [(i, f"v{i % 7}") for i in range(1, 101)])
+    conn.executemany(
+        "INSERT INTO b VALUES (?, ?, ?)", [(1000 - i, i, f"w{i % 5}") for i in range(1, 101)]
+    )
+    yield conn
+    conn.close()
+
+
+def fetch_pages(conn: sqlite3.Connection, sql: str, page_size: int) -> tuple[list, list]:
+    """Page through a query; returns (rows of all pages, plans used)."""
+    statement = sqlglot.parse_one(sql, read=DIALECT)
+    rows, plans, token = [], [], None
+    while True:
+        page, plan = plan_page(statement, DIALECT, page_size, token)
+        plans.append(plan)
+        cursor = conn.execute(page.sql(dialect=DIALECT))
+        columns = [Column(name=desc[0], type="integer") for desc in cursor.description]
+        fetched = [list(row) for row in cursor.fetchall()]
+        rows.extend(fetched[:page_size])
+        token = next_page_token(plan, columns, fetched)
+        if token is None:
+            return rows, plans
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        # Duplicate output names from different tables
+        "SELECT b.id, a.id FROM a JOIN b ON b.a_id = a.id ORDER BY a.id",
+        "SELECT a.id, b.id FROM a JOIN b ON b.a_id = a.id ORDER BY a.id DESC",
+        "SELECT * FROM b JOIN a ON b.a_id = a.id ORDER BY a.id",
+        # An unqualified output column in a join may belong to another table
+        "SELECT b.a_id AS id, a.v FROM a JOIN b ON b.a_id = a.id ORDER BY a.id",
+    ],
+)
+def test_ambiguous_order_column_pages_with_offset(db: sqlite3.Connection, sql: str) -> None:
+    expected = [list(row) for row in db.execute(sql).fetchall()]
+    rows, plans = fetch_pages(db, sql, 7)
+    assert rows == expected
+    assert all(plan["keyset"] is None for plan in plans)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT id, v FROM a ORDER BY id",
+        "SELECT * FROM a ORDER BY id DESC",
+        "SELECT a.id, b.w FROM a JOIN b ON b.a_id = a.id ORDER BY a.id",
+        "SELECT b.id, a.v FROM a JOIN b ON b.a_id = a.id ORDER BY b.id DESC",
+    ],
+)
+def test_unique_order_column_pages_with_keyset(db: sqlite3.Connection, sql: str) -> None:
+    expected = [list(row) for row in db.execute(sql).fetchall()]
+    rows, plans = fetch_pages(db, sql, 7)
+    assert rows == expected
+    assert plans[0]["keyset"] is not None
+
+
+def test_limit_in_sql_bounds_pages(db: sqlite3.Connection) -> None:
+    sql = "SELECT b.id, a.id FROM a JOIN b ON b.a_id = a.id ORDER BY a.id LIMIT 30 OFFSET 5"
+    expected = [list(row) for row in db.execute(sql).fetchall()]
+    rows, _ = fetch_pages(db, sql, 7)
+    assert rows == expected
+
+
+def test_token_from_another_query_is_rejected(db: sqlite3.Connection) -> None:
+    _, plan = plan_page(sqlglot.parse_one("SELECT id FROM a ORDER BY id"), DIALECT, 5, None)
+    token = next_page_token(plan, [Column(name="id", type="integer")], [[i] for i in range(6)])
+    with pytest.raises(ValueError):
+        plan_page(sqlglot.parse_one("SELECT id FROM b ORDER BY id"), DIALECT, 5, token)
@@ -0,0 +1,50 @@
+"""Tests for PostgreSQL bind parameter conversion."""
+
+from datetime import UTC, date, datetime, time
+from decimal import Decimal
+
+import pytest
+from asyncpg.types import Type
+
+from src.services.pool import _is_connection_error
+from src.services.query import _postgres_params
+
+
+def types(*names: str) -> list[Type]:
+    return [Type(oid=0, name=name, kind="scalar", schema="pg_catalog") for name in names]
+
+
+def test_strings_converted_to_parameter_types():
+    values = _postgres_params(
+        ["2024-05-01", "2024-05-01T12:30:00Z", "12:30", "19.99", "42", "1.5", "TRUE", "abc"],
+        types("date", "timestamptz", "time", "numeric", "int8", "float8", "bool", "text"),
+    )
+    assert values == [
+        date(2024, 5, 1),
+        datetime(2024, 5, 1, 12, 30, tzinfo=UTC),
+        time(12, 30),
+        Decimal("19.99"),
+        42,
+        1.5,
+        True,
+        "abc",
+    ]
+
+
+def test_non_string_values_left_to_driver():
+    assert _postgres_params([7, None, True], types("numeric", "date", "bool")) == [7, None, True]
+
+
+@pytest.mark.parametrize(
+    ("value", "type_name"),
+    [("not-a-date", "date"), ("1.2.3", "numeric"), ("1.5", "int4"), ("yes", "bool")],
+)
+def test_unconvertible_string_rejected(value, type_name):
+    with pytest.raises(ValueError, match=r"\$1"):
+        _postgres_params([value], types(type_name))
+
+
+def test_client_data_error_keeps_connection():
+    from asyncpg.exceptions import _base
+
+    assert not _is_connection_error(_base.DataError("invalid input for query argument $1"))
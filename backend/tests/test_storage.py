@@ -0,0 +1,97 @@
+"""Benchmarks for the SQLite storage."""
+
+import time
+
+import aiosqlite
+import pytest
+
+from src.storage.sqlite import SQLiteStorage
+
+TABLES = 5000
+COLUMNS_PER_TABLE = 20
+
+
+def make_schema(tables: int, columns: int, data_type: str = "integer") -> list[dict]:
+    """A synthetic schema in the shape MetadataService.fetch_metadata returns."""
+    return [
+        {
+            "table_name": f"table_{t}",
+            "table_type": "TABLE",
+            "fields": [
+                {
+                    "field_name": f"column_{c}",
+                    "data_type": data_type,
+                    "is_nullable": c % 2 == 0,
+                    "column_default": None,
+                    "max_length": None,
+                }
+                for c in range(columns)
+            ],
+        }
+        for t in range(tables)
+    ]
+
+
+@pytest.fixture
+async def storage(tmp_path) -> SQLiteStorage:
+    storage = SQLiteStorage(db_path=tmp_path / "metadata.db")
+    await storage.initialize()
+    await storage.add_connection("bench", "postgresql://localhost/bench", "postgres")
+    yield storage
+    await storage.close()
+
+
+async def test_save_metadata_100k_columns(storage):
+    schema = make_schema(TABLES, COLUMNS_PER_TABLE)
+
+    start = time.perf_counter()
+    assert await storage.save_metadata("bench", schema)
+    first = time.perf_counter() - start
+
+    # Unchanged tables are skipped by fingerprint
+    start = time.perf_counter()
+    assert not await storage.save_metadata("bench", schema)
+    unchanged = time.perf_counter() - start
+
+    # Every table changed: all fields are rewritten in place
+    start = time.perf_counter()
+    assert await storage.save_metadata("bench", make_schema(TABLES, COLUMNS_PER_TABLE, "bigint"))
+    rewrite = time.perf_counter() - start
+
+    # Generous budgets, well over ten times what this takes on a laptop
+    assert first < 20, f"first save took {first:.2f}s"
+    assert unchanged < 5, f"unchanged save took {unchanged:.2f}s"
+    assert rewrite < 30, f"rewrite took {rewrite:.2f}s"
+
+    detail = await storage.get_connection_with_metadata("bench")
+    assert len(detail.tables) == TABLES
+    assert sum(len(table.fields) for table in detail.tables) == TABLES * COLUMNS_PER_TABLE
+    assert detail.tables[0].fields[0].data_type == "bigint"
+
+
+async def test_get_connection_url_throughput(storage):
+    calls = 1000
+    url = "postgresql://localhost/bench"
+
+    # How lookups worked before the shared connections: one connection per call
+    start = time.perf_counter()
+    for _ in range(calls):
+        async with aiosqlite.connect(storage.db_path) as db:
+            cursor = await db.execute("SELECT url FROM connections WHERE name = ?", ("bench",))
+            assert (await cursor.fetchone())[0] == url
+    per_connection = calls / (time.perf_counter() - start)
+
+    # Uncached: every lookup reads from the shared connection
+    start = time.perf_counter()
+    for _ in range(calls):
+        storage.cache.clear()
+        assert await storage.get_connection_url("bench") == url
+    shared = calls / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        assert await storage.get_connection_url("bench") == url
+    cached = calls / (time.perf_counter() - start)
+
+    assert shared > 2 * per_connection, f"{shared:.0f}/s shared vs {per_connection:.0f}/s"
+    assert cached > shared, f"{cached:.0f}/s cached vs {shared:.0f}/s uncached"
@@ -10,6 +10,7 @@ import type {
   LlmModel,
   UpdateFieldRequest,
   FieldMetadata,
+  RefreshJob,
 } from './types'
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || '/api/v1'
@@ -62,9 +63,15 @@ export const databaseApi = {
     await apiClient.delete(`/dbs/${name}`)
   },
 
-  // Refresh metadata
-  async refreshMetadata(name: string): Promise<DatabaseConnectionDetail> {
-    const response = await apiClient.post<DatabaseConnectionDetail>(`/dbs/${name}/refresh`)
+  // Start a background metadata refresh
+  async refreshMetadata(name: string): Promise<RefreshJob> {
+    const response = await apiClient.post<RefreshJob>(`/dbs/${name}/refresh`)
+    return response.data
+  },
+
+  // Get metadata refresh progress
+  async getRefreshJob(name: string, jobId: string): Promise<RefreshJob> {
+    const response = await apiClient.get<RefreshJob>(`/dbs/${name}/refresh/${jobId}`)
     return response.data
   },
 
@@ -5,10 +5,25 @@ export interface DatabaseConnection {
   dbType: 'postgres' | 'mysql'
   createdAt: string
   updatedAt: string
+  queryTimeout: number | null
+  resultCacheTtl: number | null
 }
 
 export interface DatabaseConnectionDetail extends DatabaseConnection {
   tables: TableMetadata[]
+  refreshJob: RefreshJob | null
+}
+
+export interface RefreshJob {
+  jobId: string
+  connectionName: string
+  status: 'pending' | 'running' | 'succeeded' | 'failed'
+  tablesTotal: number | null
+  tablesDone: number
+  schemaChanged: boolean | null
+  error: string | null
+  startedAt: string
+  finishedAt: string | null
 }
 
 export interface TableMetadata {
@@ -32,10 +47,16 @@ export interface FieldMetadata {
 // Request types
 export interface AddDatabaseRequest {
   url: string
+  queryTimeout?: number | null
+  resultCacheTtl?: number | null
 }
 
 export interface QueryRequest {
   sql: string
+  timeout?: number
+  pageSize?: number
+  pageToken?: string
+  params?: (string | number | boolean | null)[]
 }
 
 export interface NaturalQueryRequest {
@@ -58,12 +79,19 @@ export interface QueryResult {
   rows: unknown[][]
   rowCount: number
   executionTime: number
+  truncated: boolean
+  cached: boolean
+  cacheAge: number | null
+  nextPageToken: string | null
 }
 
 export interface NaturalQueryResult {
   sql: string
   explanation: string | null
   modelId: string
+  contextTables: number
+  promptTokens: number
+  fullPromptTokens: number
 }
 
 export interface LlmModel {
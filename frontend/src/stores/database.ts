@@ -5,6 +5,7 @@ import type {
   DatabaseConnectionDetail,
   QueryResult,
   LlmModel,
+  RefreshJob,
 } from '@/services/types'
 import { databaseApi, queryApi, naturalQueryApi } from '@/services/api'
 
@@ -17,6 +18,7 @@ export const useDatabaseStore = defineStore('database', () => {
   const selectedLlmModel = ref<string>('qwen-coder-plus')
   const isLoading = ref(false)
   const error = ref<string | null>(null)
+  const refreshJob = ref<RefreshJob | null>(null)
 
   // Helper actions
   function setLoading(value: boolean): void {
@@ -31,6 +33,23 @@ export const useDatabaseStore = defineStore('database', () => {
     error.value = null
   }
 
+  // Poll a metadata refresh job until it finishes, then reload the database
+  async function waitForRefresh(name: string, job: RefreshJob): Promise<void> {
+    refreshJob.value = job
+    while (job.status === 'pending' || job.status === 'running') {
+      await new Promise((resolve) => setTimeout(resolve, 1000))
+      job = await databaseApi.getRefreshJob(name, job.jobId)
+      refreshJob.value = job
+    }
+    refreshJob.value = null
+    if (job.status === 'failed') {
+      throw new Error(job.error || '元数据刷新失败')
+    }
+    if (currentDatabase.value?.name === name) {
+      currentDatabase.value = await databaseApi.getDatabase(name)
+    }
+  }
+
   // Database actions
   async function fetchDatabases(): Promise<void> {
     setLoading(true)
@@ -58,6 +77,9 @@ export const useDatabaseStore = defineStore('database', () => {
         databases.value.push(result)
       }
       currentDatabase.value = result
+      if (result.refreshJob) {
+        await waitForRefresh(name, result.refreshJob)
+      }
     } catch (e) {
       setError((e as Error).message)
       throw e
@@ -100,10 +122,8 @@ export const useDatabaseStore = defineStore('database', () => {
     setLoading(true)
     clearError()
     try {
-      const result = await databaseApi.refreshMetadata(name)
-      if (currentDatabase.value?.name === name) {
-        currentDatabase.value = result
-      }
+      const job = await databaseApi.refreshMetadata(name)
+      await waitForRefresh(name, job)
     } catch (e) {
       setError((e as Error).message)
       throw e
@@ -175,6 +195,7 @@ export const useDatabaseStore = defineStore('database', () => {
     selectedLlmModel,
     isLoading,
     error,
+    refreshJob,
     // Actions
     setLoading,
     setError,